@@ -1,4 +1,5 @@
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
 import os
 import os.path as op
 
@@ -46,7 +47,7 @@ List .nwb files and dandisets metadata.
 @click.option(
     "-J",
     "--jobs",
-    help="Number of parallel download jobs.",
+    help="Number of parallel jobs to use for collecting metadata.",
     default=6,  # TODO: come up with smart auto-scaling etc
     show_default=True,
 )
@@ -87,6 +88,7 @@ def ls(
         YAMLFormatter,
     )
     from ..consts import metadata_all_fields
+    from ..dandiapi import iter_assets_metadata
 
     # TODO: avoid
     from ..support.pyout import PYOUT_SHORT_NAMES_rev
@@ -139,11 +141,14 @@ def ls(
                         }
                         yield rec
                     if not isinstance(parsed_url, DandisetURL) or recursive:
-                        for a in assets:
-                            rec = a.json_dict()
-                            if metadata in ("all", "assets"):
-                                rec["metadata"] = a.get_raw_metadata()
-                            yield rec
+                        if metadata in ("all", "assets"):
+                            for a, meta in iter_assets_metadata(assets, jobs=jobs):
+                                rec = a.json_dict()
+                                rec["metadata"] = meta
+                                yield rec
+                        else:
+                            for a in assets:
+                                yield a.json_dict()
             else:
                 # For now we support only individual files
                 yield path
@@ -175,40 +180,61 @@ def ls(
     async_keys = tuple(async_keys.difference(common_fields))
 
     errors = defaultdict(list)  # problem: [] paths
-    with out:
+
+    # Parallelize only if there is more than a single local path to process.
+    # pyout runs the callbacks in its own threads
+    if (
+        format != "pyout"
+        and async_keys
+        and jobs > 1
+        and (recursive or sum(not is_url(p) for p in paths) > 1)
+    ):
+        executor = ProcessPoolExecutor(max_workers=jobs)
+    else:
+        executor = None
+
+    def records_gen():
+        # Records for local paths might be computed in parallel by worker
+        # processes; they are yielded in the order of assets_gen() while keeping
+        # a bounded number of paths in flight
+        pending = deque()
         for asset in assets_gen():
             if isinstance(asset, str):  # path
-                rec = {}
-                rec["path"] = asset
-
-                try:
-                    if (not fields or "size" in fields) and not op.isdir(asset):
-                        rec["size"] = os.stat(asset).st_size
-
-                    if async_keys:
-                        cb = get_metadata_ls(
-                            asset,
-                            async_keys,
-                            errors=errors,
-                            flatten=format == "pyout",
-                            schema=schema,
-                            use_fake_digest=use_fake_digest,
-                        )
-                        if format == "pyout":
-                            rec[async_keys] = cb
-                        else:
-                            # TODO: parallel execution
-                            # For now just call callback and get all the fields
-                            cb_res = cb()
-                            # TODO: we should stop masking exceptions in get_metadata_ls,
-                            # and centralize logic regardless either it is for pyout or not
-                            # and do parallelizaion on our end, so at large it is
-                            if cb_res is None:
-                                raise
-                            for k, v in cb_res.items():
-                                rec[k] = v
-                except Exception as exc:
-                    _add_exc_error(asset, rec, errors, exc)
+                if format == "pyout":
+                    rec = {}
+                    rec["path"] = asset
+                    try:
+                        if (not fields or "size" in fields) and not op.isdir(asset):
+                            rec["size"] = os.stat(asset).st_size
+                        if async_keys:
+                            rec[async_keys] = get_metadata_ls(
+                                asset,
+                                async_keys,
+                                errors=errors,
+                                flatten=True,
+                                schema=schema,
+                                use_fake_digest=use_fake_digest,
+                            )
+                    except Exception as exc:
+                        _add_exc_error(asset, rec, errors, exc)
+                elif executor is not None:
+                    rec = executor.submit(
+                        _get_path_rec,
+                        asset,
+                        fields,
+                        async_keys,
+                        schema=schema,
+                        use_fake_digest=use_fake_digest,
+                    )
+                else:
+                    rec, rec_errors = _get_path_rec(
+                        asset,
+                        fields,
+                        async_keys,
+                        schema=schema,
+                        use_fake_digest=use_fake_digest,
+                    )
+                    _merge_errors(errors, rec_errors)
             elif isinstance(asset, dict):
                 # ready record
                 if schema is not None and asset.get("schemaVersion") != schema:
@@ -222,12 +248,25 @@ def ls(
                 rec = asset
             else:
                 raise TypeError(asset)
-
-            if not rec:
-                errors["Empty record"].append(asset)
-                lgr.debug("Skipping a record for %s since empty", asset)
-                continue
-            out(rec)
+            pending.append((asset, rec))
+            while pending and (
+                len(pending) >= 2 * jobs or not isinstance(pending[0][1], Future)
+            ):
+                yield _resolve_record(*pending.popleft(), errors)
+        while pending:
+            yield _resolve_record(*pending.popleft(), errors)
+
+    try:
+        with out:
+            for asset, rec in records_gen():
+                if not rec:
+                    errors["Empty record"].append(asset)
+                    lgr.debug("Skipping a record for %s since empty", asset)
+                    continue
+                out(rec)
+    finally:
+        if executor is not None:
+            executor.shutdown()
     if errors:
         lgr.warning(
             "Failed to operate on some paths (empty records were listed):\n %s",
@@ -235,6 +274,48 @@ def ls(
         )
 
 
+def _get_path_rec(path, fields, keys, schema=None, use_fake_digest=False):
+    """Compose a (non-pyout) record for a local path
+
+    Returns the record and the errors encountered while composing it, so that
+    it could be run in a separate process.
+    """
+    errors = defaultdict(list)
+    rec = {}
+    rec["path"] = path
+    try:
+        if (not fields or "size" in fields) and not op.isdir(path):
+            rec["size"] = os.stat(path).st_size
+        if keys:
+            # TODO: we should stop masking exceptions in get_metadata_ls,
+            # and centralize logic regardless either it is for pyout or not
+            rec.update(
+                get_metadata_ls(
+                    path,
+                    keys,
+                    errors=errors,
+                    schema=schema,
+                    use_fake_digest=use_fake_digest,
+                )()
+            )
+    except Exception as exc:
+        _add_exc_error(path, rec, errors, exc)
+    return rec, errors
+
+
+def _resolve_record(asset, rec, errors):
+    """Wait for a record computed by a worker process, collecting its errors"""
+    if isinstance(rec, Future):
+        rec, rec_errors = rec.result()
+        _merge_errors(errors, rec_errors)
+    return asset, rec
+
+
+def _merge_errors(errors, new_errors):
+    for k, v in new_errors.items():
+        errors[k].extend(v)
+
+
 def _add_exc_error(asset, rec, errors, exc):
     """A helper to centralize collection of errors for pyout and non-pyout reporting"""
     lgr.debug("Problem obtaining metadata for %s: %s", asset, exc)
@@ -326,7 +407,7 @@ def get_metadata_ls(
 ):
     from ..dandiset import APIDandiset
     from ..metadata import get_metadata, nwb2asset
-    from ..pynwb_utils import get_nwb_version, ignore_benign_pynwb_warnings
+    from ..pynwb_utils import ignore_benign_pynwb_warnings, inspect_nwb
     from ..support.digests import get_digest
 
     ignore_benign_pynwb_warnings()
@@ -367,7 +448,7 @@ def get_metadata_ls(
         ):
             # Let's at least get that one
             try:
-                rec["nwb_version"] = get_nwb_version(path)
+                rec["nwb_version"] = inspect_nwb(path)["nwb_version"]
             except Exception as exc:
                 _add_exc_error(path, rec, errors, exc)
         return rec
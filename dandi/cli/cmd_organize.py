@@ -34,6 +34,39 @@ from ..consts import file_operation_modes
     default="auto",
     show_default=True,
 )
+@click.option(
+    "-J",
+    "--jobs",
+    help="Number of files to load metadata from in parallel (in separate "
+    "processes), and to act upon in parallel (in threads).  Defaults to the "
+    "number of CPUs.",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Process only the files which are new or changed since they were "
+    "last organized into the dandiset, failing if their new paths conflict "
+    "with the ones of previously organized files.",
+)
+@click.option(
+    "--rollback",
+    is_flag=True,
+    help="Undo the file actions of a failed run (as recorded in its journal "
+    "within the dandiset) and exit.",
+)
+@click.option(
+    "--save-plan",
+    help="Save the planned file actions (as JSON) into the given file instead "
+    "of performing them.  The plan could then be executed with --execute-plan.",
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--execute-plan",
+    "execute_plan_file",
+    help="Perform the file actions of a plan saved with --save-plan and exit.",
+    type=click.Path(exists=True, dir_okay=False),
+)
 @click.argument("paths", nargs=-1, type=click.Path(exists=True))
 @devel_debug_option()
 @map_to_click_exceptions
@@ -42,6 +75,11 @@ def organize(
     dandiset_path=None,
     invalid="fail",
     files_mode="auto",
+    jobs=None,
+    incremental=False,
+    rollback=False,
+    save_plan=None,
+    execute_plan_file=None,
     devel_debug=False,
 ):
     """(Re)organize files according to the metadata.
@@ -76,14 +114,19 @@ def organize(
     (re)organized dandisets.
     """
     from ..dandiset import Dandiset
-    from ..metadata import get_metadata
     from ..organize import (
+        OrganizeIndex,
+        OrganizeJournal,
+        OrganizePlan,
         create_unique_filenames_from_metadata,
         detect_link_type,
+        execute_plan,
         filter_invalid_metadata_rows,
+        load_metadata,
+        plan_organize,
     )
     from ..pynwb_utils import ignore_benign_pynwb_warnings
-    from ..utils import Parallel, copy_file, delayed, find_files, load_jsonl, move_file
+    from ..utils import find_files, load_jsonl
 
     in_place = False  # If we deduce that we are organizing in-place
 
@@ -91,16 +134,34 @@ def organize(
     def dry_print(msg):
         print(f"DRY: {msg}")
 
-    if files_mode == "dry":
-
-        def act(func, *args, **kwargs):
-            dry_print(f"{func.__name__} {args}, {kwargs}")
-
-    else:
-
-        def act(func, *args, **kwargs):
-            lgr.debug("%s %s %s", func.__name__, args, kwargs)
-            return func(*args, **kwargs)
+    if execute_plan_file:
+        conflicting = [
+            opt
+            for opt, given in [
+                ("PATHS", paths),
+                ("--dandiset-path", dandiset_path is not None),
+                ("--files-mode", files_mode != "auto"),
+                ("--invalid", invalid != "fail"),
+                ("--incremental", incremental),
+                ("--rollback", rollback),
+                ("--save-plan", save_plan),
+            ]
+            if given
+        ]
+        if conflicting:
+            raise ValueError(
+                f"--execute-plan cannot be used with {', '.join(conflicting)}:"
+                " everything is defined by the plan"
+            )
+        # the plan knows everything, including the dandiset path
+        plan = OrganizePlan.load(execute_plan_file)
+        acted_upon = execute_plan(plan, jobs=jobs)
+        lgr.info(
+            "Performed %d file actions. Visit %s/",
+            len(acted_upon),
+            plan.dandiset_path.rstrip("/"),
+        )
+        return
 
     if dandiset_path is None:
         dandiset = Dandiset.find(os.curdir)
@@ -112,6 +173,16 @@ def organize(
         dandiset_path = dandiset.path
         del dandiset
 
+    if rollback:
+        journal = OrganizeJournal(dandiset_path)
+        if not len(journal):
+            lgr.info("No actions of a failed organize to roll back")
+        else:
+            lgr.info("Rolling back %d actions of a failed organize", len(journal))
+            journal.rollback()
+        return
+    journal = OrganizeJournal(dandiset_path) if files_mode != "dry" else None
+
     # Early checks to not wait to fail
     if files_mode == "simulate":
         # in this mode we will demand the entire output folder to be absent
@@ -142,43 +213,43 @@ def organize(
         in_place = True
         paths = dandiset_path
 
+    organize_index = None
+    organized = []
     if len(paths) == 1 and paths[0].endswith(".json"):
         # Our dumps of metadata
+        if incremental:
+            raise ValueError("--incremental cannot be used with metadata dumps")
         metadata = load_jsonl(paths[0])
     else:
-        paths = list(find_files(r"\.nwb\Z", paths=paths))
+        paths = list(find_files(r"\.nwb\Z", paths=paths, jobs=jobs))
+        if incremental:
+            organize_index = OrganizeIndex(dandiset_path)
+            npaths = len(paths)
+            paths = [p for p in paths if organize_index.get_dandi_path(p) is None]
+            # Names of the new files are to be consistent with the ones
+            # organized before
+            organized = organize_index.get_organized(exclude=paths)
+            lgr.info(
+                "%d out of %d files are new or changed since organized",
+                len(paths),
+                npaths,
+            )
         lgr.info("Loading metadata from %d files", len(paths))
         # Done here so we could still reuse cached 'get_metadata'
         # without having two types of invocation and to guard against
         # problematic ones -- we have an explicit option on how to
         # react to those
-        # Doesn't play nice with Parallel
-        # with tqdm.tqdm(desc="Files", total=len(paths), unit="file", unit_scale=False) as pbar:
+        metadata = []
         failed = []
-
-        def _get_metadata(path):
-            try:
-                meta = get_metadata(path)
-            except Exception as exc:
+        for path, meta, error in load_metadata(
+            paths, jobs=jobs, devel_debug=devel_debug
+        ):
+            if error is not None:
                 meta = {}
                 failed.append(path)
-                # pbar.desc = "Files (%d failed)" % len(failed)
-                lgr.debug("Failed to get metadata for %s: %s", path, exc)
-            # pbar.update(1)
+                lgr.debug("Failed to get metadata for %s: %s", path, error)
             meta["path"] = path
-            return meta
-
-        if not devel_debug:
-            # Note: It is Python (pynwb) intensive, not IO, so ATM there is little
-            # to no benefit from Parallel without using multiproc!  But that would
-            # complicate progress bar indication... TODO
-            metadata = list(
-                Parallel(n_jobs=-1, verbose=10)(
-                    delayed(_get_metadata)(path) for path in paths
-                )
-            )
-        else:
-            metadata = list(map(_get_metadata, paths))
+            metadata.append(meta)
         if failed:
             lgr.warning(
                 "Failed to load metadata for %d out of %d files",
@@ -205,103 +276,42 @@ def organize(
             raise ValueError(f"invalid has an invalid value {invalid}")
 
     if not op.exists(dandiset_path):
-        act(os.makedirs, dandiset_path)
+        if files_mode == "dry":
+            dry_print(f"makedirs {dandiset_path}")
+        else:
+            os.makedirs(dandiset_path)
 
     if files_mode == "auto":
         files_mode = detect_link_type(dandiset_path)
 
-    metadata = create_unique_filenames_from_metadata(metadata)
+    metadata = create_unique_filenames_from_metadata(metadata, organized=organized)
+    if organize_index is not None:
+        organize_index.check_conflicts(metadata)
 
-    # Verify first that the target paths do not exist yet, and fail if they do
-    # Note: in "simulate" mode we do early check as well, so this would be
-    # duplicate but shouldn't hurt
-    existing = []
-    for e in metadata:
-        dandi_fullpath = op.join(dandiset_path, e["dandi_path"])
-        if op.exists(dandi_fullpath):
-            # It might be the same file, then we would not complain
-            if not (
-                op.realpath(e["path"])
-                == op.realpath(op.join(dandiset_path, e["dandi_path"]))
-            ):
-                existing.append(dandi_fullpath)
-            # TODO: it might happen that with "move" we are renaming files
-            # so there is an existing, which also gets moved away "first"
-            # May be we should RF so the actual loop below would be first done
-            # "dry", collect info on what is actually to be done, and then we would complain here
-    if existing:
-        raise AssertionError(
-            "%d paths already exist: %s%s.  Remove them first."
-            % (
-                len(existing),
-                ", ".join(existing[:5]),
-                " and more" if len(existing) > 5 else "",
-            )
-        )
-
-    # we should take additional care about paths if both top_path and
-    # provided paths are relative
-    use_abs_paths = op.isabs(dandiset_path) or any(
-        op.isabs(e["path"]) for e in metadata
+    plan = plan_organize(
+        metadata,
+        dandiset_path,
+        files_mode,
+        organize_index=organize_index,
+        journal=journal,
     )
-    skip_same = []
-    acted_upon = []
-    for e in metadata:
-        dandi_path = e["dandi_path"]
-        dandi_fullpath = op.join(dandiset_path, dandi_path)
-        dandi_abs_fullpath = (
-            op.abspath(dandi_fullpath)
-            if not op.isabs(dandi_fullpath)
-            else dandi_fullpath
+    if save_plan:
+        plan.save(save_plan)
+        lgr.info(
+            "Saved a plan of %d file actions to %s",
+            len(plan.get_actions()),
+            save_plan,
         )
-        dandi_dirpath = op.dirname(dandi_fullpath)  # could be sub-... subdir
-
-        e_path = e["path"]
-        e_abs_path = e_path
-
-        if not op.isabs(e_path):
-            e_abs_path = op.abspath(e_path)
-            if use_abs_paths:
-                e_path = e_abs_path
-            elif files_mode == "symlink":  # path should be relative to the target
-                e_path = op.relpath(e_abs_path, dandi_dirpath)
-
-        if dandi_abs_fullpath == e_abs_path:
-            lgr.debug("Skipping %s since the same in source/destination", e_path)
-            skip_same.append(e)
-            continue
-        elif files_mode == "symlink" and op.realpath(dandi_abs_fullpath) == op.realpath(
-            e_abs_path
-        ):
-            lgr.debug(
-                "Skipping %s since mode is symlink and both resolve to the same path",
-                e_path,
-            )
-            skip_same.append(e)
-            continue
-
-        if (
-            files_mode == "dry"
-        ):  # TODO: this is actually a files_mode on top of modes!!!?
-            dry_print(f"{e_path} -> {dandi_path}")
-        else:
-            if not op.exists(dandi_dirpath):
-                os.makedirs(dandi_dirpath)
-            if files_mode == "simulate":
-                os.symlink(e_path, dandi_fullpath)
-                continue
-            #
-            if files_mode == "symlink":
-                os.symlink(e_path, dandi_fullpath)
-            elif files_mode == "hardlink":
-                os.link(e_path, dandi_fullpath)
-            elif files_mode == "copy":
-                copy_file(e_path, dandi_fullpath)
-            elif files_mode == "move":
-                move_file(e_path, dandi_fullpath)
-            else:
-                raise NotImplementedError(files_mode)
-            acted_upon.append(e)
+        return
+    skip_same = [i for i in plan if i["action"] == "skip"]
+    if files_mode == "dry":  # TODO: this is actually a files_mode on top of modes!!!?
+        for i in plan.get_actions():
+            dry_print(f"{i['source']} -> {i['dandi_path']}")
+        acted_upon = []
+    else:
+        acted_upon = execute_plan(plan, jobs=jobs)
+        if files_mode == "simulate":
+            acted_upon = []
 
     if acted_upon and in_place:
         # We might need to cleanup a bit - e.g. prune empty directories left
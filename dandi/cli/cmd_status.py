@@ -0,0 +1,77 @@
+import os
+import os.path as op
+
+import click
+
+from .base import map_to_click_exceptions
+
+
+@click.command()
+@click.option(
+    "-a", "--all", "show_all", is_flag=True, help="List unchanged files as well."
+)
+@click.option(
+    "-J",
+    "--jobs",
+    help="Number of directories to list in parallel.",
+    type=click.IntRange(min=1),
+)
+@click.argument("paths", nargs=-1, type=click.Path(exists=True, dir_okay=True))
+@map_to_click_exceptions
+def status(paths, show_all=False, jobs=None):
+    """Report files of a dandiset changed since dandi last operated on them.
+
+    Files under PATHS (by default -- the current directory) are compared with
+    the state of the dandiset recorded by "upload", "download", and
+    "validate", and listed as "new", "modified", or "deleted".  Unchanged
+    files, which were found invalid or were not uploaded or downloaded, are
+    marked as such when listed.
+    """
+    from ..consts import dandiset_metadata_file
+    from ..dandiset import Dandiset, DandisetState
+    from ..utils import find_file_entries, pluralize
+
+    if not paths:
+        paths = [os.curdir]
+    dandiset = Dandiset.find(paths[0])
+    if dandiset is None:
+        raise ValueError(
+            f"Found no {dandiset_metadata_file} anywhere in {paths[0]!r} or its "
+            "parents.  Use 'dandi download' or 'dandi organize' first."
+        )
+    state = DandisetState(dandiset.path)
+    metadata_file = op.abspath(op.join(dandiset.path, dandiset_metadata_file))
+    entries = (
+        e
+        for e in find_file_entries(".*", list(paths), jobs=jobs)
+        if op.abspath(e.path) != metadata_file
+    )
+    counts = {}
+    for path, rec in sorted(state.get_changes(entries, paths), key=lambda r: r[0]):
+        counts[rec["status"]] = counts.get(rec["status"], 0) + 1
+        invalid = bool(rec.get("validation") and rec["validation"]["errors"])
+        if rec["status"] == "unchanged":
+            if invalid:
+                counts["invalid"] = counts.get("invalid", 0) + 1
+            if not show_all:
+                continue
+        notes = []
+        if rec["status"] != "new":
+            if invalid:
+                notes.append("invalid")
+            if rec["asset_id"] is None:
+                notes.append("not on server")
+        line = f"{rec['status'] + ':':<11} {path}"
+        if notes:
+            line += f" ({', '.join(notes)})"
+        click.echo(line)
+    nfiles = sum(counts.get(s, 0) for s in ("new", "modified", "deleted", "unchanged"))
+    summary = ", ".join(
+        f"{counts[s]} {s}"
+        for s in ("new", "modified", "deleted", "unchanged", "invalid")
+        if counts.get(s)
+    )
+    click.secho(
+        f"Summary: {pluralize(nfiles, 'file')}" + (f": {summary}" if summary else ""),
+        bold=True,
+    )
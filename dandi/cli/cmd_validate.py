@@ -8,10 +8,24 @@ from .base import devel_debug_option, devel_option, lgr, map_to_click_exceptions
 
 @click.command()
 @devel_option("--schema", help="Validate against new schema version", metavar="VERSION")
+@click.option(
+    "-J",
+    "--jobs",
+    help="Number of files to validate in parallel (in separate processes).",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--changed-only",
+    is_flag=True,
+    help="Only validate files which were changed, or not found valid, since "
+    "they were last validated.",
+)
 @click.argument("paths", nargs=-1, type=click.Path(exists=True, dir_okay=True))
 @devel_debug_option()
 @map_to_click_exceptions
-def validate(paths, schema=None, devel_debug=False):
+def validate(paths, jobs=1, changed_only=False, schema=None, devel_debug=False):
     """Validate files for NWB (and DANDI) compliance.
 
     Exits with non-0 exit code if any file is not compliant.
@@ -37,7 +51,11 @@ def validate(paths, schema=None, devel_debug=False):
     all_files_errors = {}
     nfiles = 0
     for path, errors in validate_(
-        paths, schema_version=schema, devel_debug=devel_debug
+        paths,
+        schema_version=schema,
+        devel_debug=devel_debug,
+        jobs=jobs,
+        changed_only=changed_only,
     ):
         nfiles += 1
         if view == "one-at-a-time":
@@ -145,6 +145,7 @@ from .cmd_download import download  # noqa: E402
 from .cmd_ls import ls  # noqa: E402
 from .cmd_organize import organize  # noqa: E402
 from .cmd_shell_completion import shell_completion  # noqa: E402
+from .cmd_status import status  # noqa: E402
 from .cmd_upload import upload  # noqa: E402
 from .cmd_validate import validate  # noqa: E402
 
@@ -154,6 +155,7 @@ __all_commands__ = (
     upload,
     download,
     validate,
+    status,
     digest,
     delete,
     shell_completion,
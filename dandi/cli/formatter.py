@@ -1,12 +1,62 @@
 import datetime
+import json
 import sys
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .. import get_logger
 from ..support import pyout as pyouts
 
 lgr = get_logger()
 
 
+def _json_serializer(o):
+    if isinstance(o, datetime.datetime):
+        return str(o)
+    return o
+
+
+def _has_floats(o):
+    if isinstance(o, float):
+        return True
+    elif isinstance(o, dict):
+        return any(map(_has_floats, o.values()))
+    elif isinstance(o, (list, tuple)):
+        return any(map(_has_floats, o))
+    return False
+
+
+def _json_dumps(rec, indent=None):
+    """Serialize a record to JSON with sorted keys
+
+    orjson is used, if available, for the indented output (for which the
+    ``json`` module has to fall back to its pure Python encoder) as long as it
+    produces the same text ``json`` would.  Since orjson formats some floats
+    (e.g. ``1e+16``) and NaN differently, records with floats are always
+    serialized by ``json``.
+    """
+    if orjson is not None and indent == 2 and not _has_floats(rec):
+        try:
+            s = orjson.dumps(
+                rec,
+                default=_json_serializer,
+                option=orjson.OPT_INDENT_2
+                | orjson.OPT_SORT_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME,
+            ).decode("utf-8")
+        except TypeError:
+            # e.g. non-str keys or too large integers
+            pass
+        else:
+            # json escapes all non-ASCII characters
+            if s.isascii():
+                return s
+    return json.dumps(rec, indent=indent, sort_keys=True, default=_json_serializer)
+
+
 class Formatter(object):
     def __enter__(self):
         pass
@@ -24,12 +74,6 @@ class JSONFormatter(Formatter):
         self.indent = indent
         self.first = True
 
-    @staticmethod
-    def _serializer(o):
-        if isinstance(o, datetime.datetime):
-            return str(o)
-        return o
-
     def __enter__(self):
         print("[", end="", file=self.out)
 
@@ -39,7 +83,6 @@ class JSONFormatter(Formatter):
         print("]", file=self.out)
 
     def __call__(self, rec):
-        import json
         from textwrap import indent
 
         if self.first:
@@ -48,9 +91,7 @@ class JSONFormatter(Formatter):
         else:
             print(",", file=self.out)
 
-        s = json.dumps(
-            rec, indent=self.indent, sort_keys=True, default=self._serializer
-        )
+        s = _json_dumps(rec, indent=self.indent)
         print(indent(s, " " * (self.indent or 2)), end="", file=self.out)
 
 
@@ -59,37 +100,35 @@ class JSONLinesFormatter(Formatter):
         self.out = out or sys.stdout
         self.indent = indent
 
-    @staticmethod
-    def _serializer(o):
-        if isinstance(o, datetime.datetime):
-            return str(o)
-        return o
-
     def __call__(self, rec):
-        import json
-
-        print(
-            json.dumps(
-                rec, indent=self.indent, sort_keys=True, default=self._serializer
-            ),
-            file=self.out,
-        )
+        print(_json_dumps(rec, indent=self.indent), file=self.out)
 
 
 class YAMLFormatter(Formatter):
+    """Output records as a YAML list, dumping each record as it comes
+
+    Dumps of single-item lists concatenate into the same document as a dump of
+    the list of all records would produce, so records need not be accumulated.
+    """
+
     def __init__(self, out=None):
         self.out = out or sys.stdout
-        self.records = []
+        self.yaml = None
+        self.first = True
 
-    def __exit__(self, exc_type, exc_value, traceback):
+    def __enter__(self):
         import ruamel.yaml
 
-        yaml = ruamel.yaml.YAML(typ="safe")
-        yaml.default_flow_style = False
-        yaml.dump(self.records, self.out)
+        self.yaml = ruamel.yaml.YAML(typ="safe")
+        self.yaml.default_flow_style = False
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.first:
+            print("[]", file=self.out)
 
     def __call__(self, rec):
-        self.records.append(rec)
+        self.first = False
+        self.yaml.dump([rec], self.out)
 
 
 class PYOUTFormatter(pyouts.LogSafeTabular):
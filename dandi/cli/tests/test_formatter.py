@@ -1,8 +1,12 @@
+from datetime import datetime
 from io import StringIO
+import json
 
 import pytest
 
-from ..formatter import JSONFormatter, JSONLinesFormatter
+from .. import formatter
+from ..formatter import JSONFormatter, JSONLinesFormatter, YAMLFormatter
+from ...utils import yaml_load
 
 
 def test_json_formatter():
@@ -39,6 +43,41 @@ def test_json_formatter_indented():
     )
 
 
+@pytest.mark.parametrize(
+    "rec",
+    [
+        {"name": "Ñoño", "age": 42},
+        {"date": datetime(2021, 6, 7, 12, 34, 56), "sizes": [1, 2**70]},
+        {1: "non-str key", 2: {"nested": [], "empty": {}}},
+    ],
+)
+def test_json_formatter_indented_like_json(rec):
+    out = StringIO()
+    fmtr = JSONFormatter(indent=2, out=out)
+    with fmtr:
+        fmtr(rec)
+    s = json.dumps(rec, indent=2, sort_keys=True, default=str)
+    assert (
+        out.getvalue()
+        == "[\n" + "\n".join("  " + ln for ln in s.splitlines()) + "\n]\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "rec",
+    [
+        {"size": 1e16, "tiny": 1e-7, "ratio": 0.1, "nan": float("nan")},
+        {"nested": [{"inf": float("inf")}, (1.5, 2)], "count": 3},
+    ],
+)
+def test_json_dumps_floats_like_json(monkeypatch, rec):
+    pytest.importorskip("orjson")
+    s = formatter._json_dumps(rec, indent=2)
+    monkeypatch.setattr(formatter, "orjson", None)
+    assert formatter._json_dumps(rec, indent=2) == s
+    assert s == json.dumps(rec, indent=2, sort_keys=True)
+
+
 @pytest.mark.parametrize("indent", [None, 2])
 def test_json_formatter_empty(indent):
     out = StringIO()
@@ -65,3 +104,33 @@ def test_json_lines_formatter_empty():
     with fmtr:
         pass
     assert out.getvalue() == ""
+
+
+def test_yaml_formatter():
+    out = StringIO()
+    fmtr = YAMLFormatter(out=out)
+    with fmtr:
+        fmtr({"foo": 23, "bar": [42, {"baz": None}]})
+        assert out.getvalue() != ""
+        fmtr({"bar": "gnusto", "foo": "cleesh"})
+    assert out.getvalue() == (
+        "- bar:\n"
+        "  - 42\n"
+        "  - baz: null\n"
+        "  foo: 23\n"
+        "- bar: gnusto\n"
+        "  foo: cleesh\n"
+    )
+    assert yaml_load(out.getvalue(), typ="safe") == [
+        {"foo": 23, "bar": [42, {"baz": None}]},
+        {"bar": "gnusto", "foo": "cleesh"},
+    ]
+
+
+def test_yaml_formatter_empty():
+    out = StringIO()
+    fmtr = YAMLFormatter(out=out)
+    with fmtr:
+        pass
+    assert out.getvalue() == "[]\n"
+    assert yaml_load(out.getvalue(), typ="safe") == []
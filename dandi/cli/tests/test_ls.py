@@ -100,3 +100,18 @@ def test_smoke_local_schema(simple1_nwb):
     metadata = json.loads(out)
     assert len(metadata) == 1
     assert metadata[0]["digest"] == {"dandi:dandi-etag": ANY}
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_ls_multiple_paths(simple1_nwb, simple2_nwb, tmp_path, jobs):
+    badfile = tmp_path / "bad.nwb"
+    badfile.write_text("not an NWB file")
+    paths = [simple1_nwb, str(badfile), simple2_nwb]
+    r = CliRunner().invoke(ls, ["-f", "json_lines", "-J", str(jobs), *paths])
+    assert r.exit_code == 0, r.output
+    recs = [json.loads(line) for line in r.stdout.splitlines()]
+    assert [rec["path"] for rec in recs] == paths
+    assert recs[0]["nwb_version"].startswith("2.")
+    assert "errors" not in recs[0]
+    assert recs[1]["errors"] > 0
+    assert recs[2]["session_id"] == recs[0]["session_id"]
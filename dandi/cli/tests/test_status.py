@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from ..cmd_status import status
+from ...dandiset import DandisetState
+
+
+def test_status():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path("dandiset.yaml").write_text("identifier: '000000'\n")
+        Path("sub-1").mkdir()
+        for name in ["a.nwb", "b.nwb", "c.nwb"]:
+            Path("sub-1", name).write_text(name)
+        state = DandisetState(".")
+        state.update("sub-1/a.nwb", etag="etag-a", asset_id="A")
+        state.update(
+            "sub-1/b.nwb",
+            etag="etag-b",
+            validation={"schema_version": None, "errors": ["bad"]},
+        )
+        state.save()
+        Path("sub-1", "a.nwb").write_text("changed content")
+        r = runner.invoke(status, [])
+        assert r.exit_code == 0, r.output
+        assert r.output.splitlines() == [
+            "modified:   sub-1/a.nwb",
+            "new:        sub-1/c.nwb",
+            "Summary: 3 files: 1 new, 1 modified, 1 unchanged, 1 invalid",
+        ]
+        r = runner.invoke(status, ["--all", "sub-1/b.nwb"])
+        assert r.exit_code == 0, r.output
+        assert r.output.splitlines() == [
+            "unchanged:  sub-1/b.nwb (invalid, not on server)",
+            "Summary: 1 file: 1 unchanged, 1 invalid",
+        ]
+
+
+def test_status_no_dandiset():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        r = runner.invoke(status, [])
+        assert r.exit_code != 0
+        assert "Found no dandiset.yaml" in r.output
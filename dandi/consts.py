@@ -42,6 +42,12 @@ metadata_nwb_fields = (
     + metadata_nwb_computed_fields
 )
 
+# How to extract metadata from .nwb files: "h5py" reads the fields directly
+# from the HDF5 file (falling back to pynwb for files it cannot handle), while
+# "pynwb" always loads the complete NWBFile (slow but authoritative)
+metadata_nwb_extractors = ("h5py", "pynwb")
+metadata_nwb_extractor = os.environ.get("DANDI_METADATA_EXTRACTOR", "h5py")
+
 # TODO: include/use schema, for now hardcoding most useful ones to be used
 # while listing dandisets
 metadata_dandiset_fields = (
@@ -115,3 +121,23 @@ file_operation_modes = [
 # TODO: should we make them smaller for download than for upload?
 # ATM used only in download
 MAX_CHUNK_SIZE = int(os.environ.get("DANDI_MAX_CHUNK_SIZE", 1024 * 1024 * 8))  # 64
+
+#
+# Opt-in on-disk cache of responses to API GET requests.  Cached responses are
+# revalidated with the server, except for the ones for published (immutable)
+# versions of dandisets which are used without revalidation for up to TTL
+# seconds.
+#
+HTTP_CACHE = os.environ.get("DANDI_HTTP_CACHE", "") not in ("", "0", "no", "false")
+HTTP_CACHE_DIR = os.environ.get("DANDI_HTTP_CACHE_DIR")
+HTTP_CACHE_TTL = int(os.environ.get("DANDI_HTTP_CACHE_TTL", 7 * 24 * 3600))
+HTTP_CACHE_MAX_SIZE = int(
+    os.environ.get("DANDI_HTTP_CACHE_MAX_SIZE", 512 * 1024 * 1024)
+)
+
+#
+# Directory to keep the state of local dandisets in (see `DandisetState`).  By
+# default -- "dandisets" under the user cache directory, so that dandi does not
+# write into dandisets unless asked to modify them.
+#
+STATE_DIR = os.environ.get("DANDI_STATE_DIR")
@@ -3,10 +3,11 @@
 # under the Apache 2.0 license
 
 from dataclasses import dataclass
+import hashlib
 from hashlib import md5
 import math
 import os
-from typing import Iterator, List, NamedTuple, Optional, Union
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Union
 
 
 def mb(bytes_size: int) -> int:
@@ -94,12 +95,45 @@ class PartGenerator:
 class DandiETag:
     REGEX = r"[0-9a-f]{32}-\d{1,5}"
     MAX_STR_LENGTH = 38
+    #: Size in bytes of a binary MD5 digest
+    DIGEST_SIZE = md5().digest_size
 
     def __init__(self, file_size: int) -> None:
         self._part_gen: PartGenerator = PartGenerator.for_file_size(file_size)
-        self._md5_digests: List[Optional[bytes]] = [None] * len(self._part_gen)
+        # The binary MD5 digests of all parts, concatenated in part order
+        self._md5_digests: bytearray = bytearray(self.DIGEST_SIZE * self.part_qty)
+        # Bitmap of the parts whose digests have been submitted
+        self._completed: bytearray = bytearray((self.part_qty + 7) // 8)
         self._next_index: int = 0
-        self._partial_blob: bytes = b""
+        # Running MD5 of the next part's data fed so far via
+        # `partial_update()`, and the number of bytes fed into it
+        self._partial_md5: Optional["hashlib._Hash"] = None
+        self._partial_size: int = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        if self._partial_size:
+            # The running MD5 cannot be pickled, and the data fed into it is
+            # not retained
+            raise ValueError("Cannot pickle DandiETag in the middle of a part")
+        state = self.__dict__.copy()
+        state["_partial_md5"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        digests = state["_md5_digests"]
+        if isinstance(digests, list):
+            # Instance pickled (e.g., into the checksums cache) by an older
+            # version which stored a list of `Optional[bytes]`
+            state["_md5_digests"] = bytearray(self.DIGEST_SIZE * len(digests))
+            state["_completed"] = bytearray((len(digests) + 7) // 8)
+            for i, d in enumerate(digests):
+                if d is not None:
+                    state["_md5_digests"][self._digest_slice(i)] = d
+                    state["_completed"][i >> 3] |= 1 << (i & 7)
+            blob = state.pop("_partial_blob")
+            state["_partial_md5"] = md5(blob) if blob else None
+            state["_partial_size"] = len(blob) if blob else 0
+        self.__dict__.update(state)
 
     @property
     def part_qty(self) -> int:
@@ -122,17 +156,16 @@ class DandiETag:
             return None
 
     def get_part_etag(self, p: Part) -> Optional[str]:
-        return self._md5_digests[p.number - 1].hex()
+        i = p.number - 1
+        if not self._has_digest(i):
+            return None
+        return self._md5_digests[self._digest_slice(i)].hex()
 
     def as_str(self) -> str:
         if not self.complete:
             raise ValueError("Not all part hashes submitted")
-        blob = b""
-        for d in self._md5_digests:
-            assert d is not None
-            blob += d
-        parts_digest = md5(blob).hexdigest()
-        return f"{parts_digest}-{len(self._md5_digests)}"
+        parts_digest = md5(self._md5_digests).hexdigest()
+        return f"{parts_digest}-{self.part_qty}"
 
     @classmethod
     def from_file(
@@ -144,12 +177,23 @@ class DandiETag:
                 etag.update(f.read(part.size))
         return etag
 
+    @classmethod
+    def _digest_slice(cls, index: int) -> slice:
+        return slice(cls.DIGEST_SIZE * index, cls.DIGEST_SIZE * (index + 1))
+
+    def _has_digest(self, index: int) -> bool:
+        return bool(self._completed[index >> 3] & (1 << (index & 7)))
+
+    def _set_digest(self, index: int, part_digest: bytes) -> None:
+        self._md5_digests[self._digest_slice(index)] = part_digest
+        self._completed[index >> 3] |= 1 << (index & 7)
+        self._update_index()
+
     def _add_digest(self, p: Part, part_digest: bytes) -> None:
         i = p.number - 1
-        if self._md5_digests[i] is not None:
+        if self._has_digest(i):
             raise RuntimeError(f"Digest for part {p.number} submitted more than once")
-        self._md5_digests[i] = part_digest
-        self._update_index()
+        self._set_digest(i, part_digest)
 
     def _add_next_digest(self, part_digest: bytes) -> None:
         if self.complete:
@@ -157,19 +201,15 @@ class DandiETag:
                 "Trying to update DandiETag with a new digest having already"
                 f" processed all {self.part_qty} parts"
             )
-        self._md5_digests[self._next_index] = part_digest
-        self._update_index()
+        self._set_digest(self._next_index, part_digest)
 
     def _update_index(self) -> None:
-        while (
-            self._next_index < self.part_qty
-            and self._md5_digests[self._next_index] is not None
-        ):
+        while self._next_index < self.part_qty and self._has_digest(self._next_index):
             self._next_index += 1
 
     def update(self, block: bytes, part: Optional[Part] = None) -> None:
         """Update etag with the new block of data"""
-        if self._partial_blob:
+        if self._partial_size:
             raise ValueError("Digesting new part when current part is not complete")
         part_digest = md5(block).digest()
         if part is None:
@@ -178,15 +218,28 @@ class DandiETag:
             self._add_digest(part, part_digest)
 
     def partial_update(self, block: bytes) -> None:
-        self._partial_blob += block
-        p = self.get_next_part()
-        while p is not None and p.size <= len(self._partial_blob):
-            next_block = self._partial_blob[: p.size]
-            self._partial_blob = self._partial_blob[p.size :]
-            self._add_next_digest(md5(next_block).digest())
+        """
+        Update etag with the next chunk of data, which need not align with
+        part boundaries.  Data is fed straight into the running digest of the
+        current part, splitting the chunk (without copying) only where a part
+        ends.
+        """
+        view = memoryview(block)
+        while view:
             p = self.get_next_part()
-        if p is None and self._partial_blob:
-            raise ValueError("Partial update extended past end of file")
+            if p is None:
+                raise ValueError("Partial update extended past end of file")
+            if self._partial_md5 is None:
+                self._partial_md5 = md5()
+            n = min(p.size - self._partial_size, len(view))
+            self._partial_md5.update(view[:n])
+            self._partial_size += n
+            view = view[n:]
+            if self._partial_size == p.size:
+                part_digest = self._partial_md5.digest()
+                self._partial_md5 = None
+                self._partial_size = 0
+                self._add_next_digest(part_digest)
 
 
 class ETagHashlike:
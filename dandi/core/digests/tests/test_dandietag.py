@@ -1,8 +1,9 @@
+import pickle
 import re
 
 import pytest
 
-from ..dandietag import DandiETag, Part, PartGenerator, mb, tb
+from ..dandietag import DandiETag, ETagHashlike, Part, PartGenerator, mb, tb
 
 
 @pytest.mark.parametrize(
@@ -123,3 +124,74 @@ def test_add_digest_out_of_order():
         etagger._add_digest(p, d)
     assert etagger.complete
     assert etagger.as_str() == ETAG
+
+
+@pytest.mark.parametrize("blocksize", [mb(1), mb(3), mb(64), mb(100)])
+def test_partial_update(tmp_path, blocksize):
+    f = tmp_path / "sample.dat"
+    f.write_bytes(bytes(range(256)) * (mb(70) // 256))
+    hasher = ETagHashlike(mb(70))
+    with f.open("rb") as fp:
+        while True:
+            block = fp.read(blocksize)
+            if not block:
+                break
+            hasher.update(block)
+    assert hasher.etagger.complete
+    assert hasher.hexdigest() == DandiETag.from_file(f).as_str()
+
+
+def test_update_during_partial_part():
+    etagger = DandiETag(mb(70))
+    etagger.partial_update(b"123")
+    with pytest.raises(ValueError) as excinfo:
+        etagger.update(b"123")
+    assert str(excinfo.value) == "Digesting new part when current part is not complete"
+
+
+def test_partial_update_past_end():
+    etagger = DandiETag(3)
+    with pytest.raises(ValueError) as excinfo:
+        etagger.partial_update(b"1234")
+    assert str(excinfo.value) == "Partial update extended past end of file"
+
+
+def test_get_part_etag():
+    etagger = DandiETag(mb(640))
+    p1, p2 = etagger.get_part(1), etagger.get_part(2)
+    assert etagger.get_part_etag(p2) is None
+    etagger._add_digest(p2, PART_DIGESTS[1])
+    assert etagger.get_part_etag(p1) is None
+    assert etagger.get_part_etag(p2) == PART_DIGESTS[1].hex()
+    with pytest.raises(RuntimeError):
+        etagger._add_digest(p2, PART_DIGESTS[1])
+
+
+def test_pickle_roundtrip():
+    etagger = DandiETag(mb(640))
+    for d in PART_DIGESTS:
+        etagger._add_next_digest(d)
+    etagger2 = pickle.loads(pickle.dumps(etagger))
+    assert etagger2.complete
+    assert etagger2.as_str() == ETAG
+
+
+def test_pickle_partial_part():
+    etagger = DandiETag(mb(70))
+    etagger.partial_update(b"123")
+    with pytest.raises(ValueError):
+        pickle.dumps(etagger)
+
+
+def test_unpickle_legacy_state():
+    etagger = DandiETag.__new__(DandiETag)
+    etagger.__setstate__(
+        {
+            "_part_gen": PartGenerator.for_file_size(mb(640)),
+            "_md5_digests": list(PART_DIGESTS),
+            "_next_index": 10,
+            "_partial_blob": b"",
+        }
+    )
+    assert etagger.complete
+    assert etagger.as_str() == ETAG
@@ -1,11 +1,26 @@
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+import json
+import math
 import os.path
 from pathlib import Path
 import re
 from threading import Lock
-from typing import Any, Callable, Dict, Iterator, Optional, Union, cast
-from urllib.parse import urlparse, urlunparse
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+from urllib.parse import parse_qs, urlparse, urlunparse
 from xml.etree.ElementTree import fromstring
 
 import click
@@ -17,6 +32,7 @@ from . import get_logger
 from .consts import MAX_CHUNK_SIZE, known_instances, known_instances_rev
 from .exceptions import NotFoundError
 from .keyring import keyring_lookup
+from .support.httpcache import get_http_cache
 from .utils import USER_AGENT, is_interactive, try_multiple
 
 lgr = get_logger()
@@ -28,7 +44,7 @@ lgr = get_logger()
 class RESTFullAPIClient:
     """A base class for REST clients"""
 
-    def __init__(self, api_url, session=None, headers=None):
+    def __init__(self, api_url, session=None, headers=None, cache=None):
         self.api_url = api_url
         if session is None:
             session = requests.Session()
@@ -36,6 +52,9 @@ class RESTFullAPIClient:
             session.headers.update(headers)
         session.headers.setdefault("User-Agent", USER_AGENT)
         self.session = session
+        #: An optional `~dandi.support.httpcache.HTTPCache` for JSON responses
+        #: to GET requests
+        self.cache = cache
 
     def __enter__(self):
         return self
@@ -106,6 +125,23 @@ class RESTFullAPIClient:
         if json_resp and "accept" not in headers:
             headers["accept"] = "application/json"
 
+        cache_key = cache_entry = None
+        if (
+            self.cache is not None
+            and method.upper() == "GET"
+            and json_resp
+            and not kwargs.get("stream")
+        ):
+            cache_key = self.cache.get_key(
+                url, params, self.session.headers.get("Authorization")
+            )
+            cache_entry = self.cache.get(cache_key)
+            if cache_entry is not None:
+                if self.cache.is_fresh(cache_entry):
+                    lgr.debug("GET %s (cached)", url)
+                    return cache_entry["body"]
+                headers.update(self.cache.get_conditional_headers(cache_entry))
+
         lgr.debug("%s %s", method.upper(), url)
 
         # urllib3's ConnectionPool isn't thread-safe, so we sometimes hit
@@ -134,6 +170,9 @@ class RESTFullAPIClient:
 
         lgr.debug("Response: %d", result.status_code)
 
+        if cache_entry is not None and result.status_code == 304:
+            return self.cache.refresh(cache_key, cache_entry)["body"]
+
         # If success, return the json object. Otherwise throw an exception.
         if not result.ok:
             msg = f"Error {result.status_code} while sending {method} request to {url}"
@@ -146,12 +185,28 @@ class RESTFullAPIClient:
 
         if json_resp:
             if result.text.strip():
-                return result.json()
+                body = result.json()
+                if cache_key is not None:
+                    self.cache.store(
+                        cache_key,
+                        url,
+                        result.headers,
+                        body,
+                        immutable=self._is_immutable(url),
+                    )
+                return body
             else:
                 return None
         else:
             return result
 
+    def _is_immutable(self, url):
+        """
+        Whether the resource at the URL is known to never change, so that its
+        cached response need not be revalidated
+        """
+        return False
+
     def get_url(self, path):
         # Construct the url
         if path.lower().startswith(("http://", "https://")):
@@ -192,19 +247,92 @@ class RESTFullAPIClient:
         """
         return self.request("PATCH", path, **kwargs)
 
-    def paginate(self, path, page_size=None, params=None, **kwargs):
+    def paginate(self, path, page_size=None, params=None, jobs=None, **kwargs):
+        """
+        Iterate over the items of a paginated endpoint, in order
+
+        The remaining pages are requested while the items of the current page
+        are being yielded.  If the server reports the total ``count`` of items
+        and numbers the pages in its ``next`` links, pages are requested by
+        their numbers, up to ``jobs`` (default: 4) at a time, and
+        `RuntimeError` is raised if the items change while being listed;
+        otherwise, the ``next`` links are followed one at a time.
+
+        :param page_size: number of items to request per page; if not given,
+            the server's default is used
+        :type page_size: int
+        :param jobs: maximal number of pages to request concurrently
+        :type jobs: int
+        """
         if page_size is not None:
-            if params is None:
-                params = {}
-            params["page_size"] = page_size
+            params = dict(params or {}, page_size=page_size)
         r = self.get(path, params=params, **kwargs)
-        while True:
-            for item in r["results"]:
-                yield item
-            if r.get("next"):
-                r = self.get(r["next"])
+        if not r.get("next"):
+            yield from r["results"]
+            return
+        jobs = jobs or 4
+        # The first page is full, and the server might have capped page_size
+        per_page = len(r["results"])
+        count = r.get("count")
+        if parse_qs(urlparse(r["next"]).query).get("page") != ["2"]:
+            # The server does not number pages the way we would request them
+            count = None
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            if count is not None and per_page:
+                futures = deque()
+                pages = iter(range(2, math.ceil(count / per_page) + 1))
+
+                def submit_next():
+                    for page in islice(pages, 1):
+                        futures.append(
+                            executor.submit(
+                                self._get_page,
+                                path,
+                                params=dict(
+                                    params or {}, page=page, page_size=per_page
+                                ),
+                                **kwargs,
+                            )
+                        )
+
+                for _ in range(jobs):
+                    submit_next()
+                try:
+                    nitems = len(r["results"])
+                    yield from r["results"]
+                    while futures:
+                        r = futures.popleft().result()
+                        if r is None or r.get("count", count) != count:
+                            break
+                        submit_next()
+                        nitems += len(r["results"])
+                        yield from r["results"]
+                    if nitems != count:
+                        # Items were added or removed since the first page
+                        raise RuntimeError(
+                            f"Items of {path} changed while being listed"
+                            f" ({count} at the start); please retry"
+                        )
+                finally:
+                    for fut in futures:
+                        fut.cancel()
             else:
-                break
+                while True:
+                    next_url = r.get("next")
+                    fut = executor.submit(self.get, next_url) if next_url else None
+                    yield from r["results"]
+                    if fut is None:
+                        break
+                    r = fut.result()
+
+    def _get_page(self, path, **kwargs):
+        """Get a page by its number, returning `None` if there is no such page"""
+        try:
+            return self.get(path, **kwargs)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
 
 
 class DandiAPIClient(RESTFullAPIClient):
@@ -214,10 +342,14 @@ class DandiAPIClient(RESTFullAPIClient):
             api_url = known_instances[instance_name].api
             if api_url is None:
                 raise ValueError(f"No API URL for instance {instance_name!r}")
-        super().__init__(api_url)
+        super().__init__(api_url, cache=get_http_cache())
         if token is not None:
             self.authenticate(token)
 
+    def _is_immutable(self, url):
+        # Everything about a published version of a dandiset
+        return bool(re.search(r"/dandisets/\d+/versions/(?!draft/)[^/]+/", url))
+
     def authenticate(self, token):
         # Fails if token is invalid:
         self.get("/auth/token", headers={"Authorization": f"token {token}"})
@@ -273,8 +405,10 @@ class DandiAPIClient(RESTFullAPIClient):
                 return d.for_version(version_id)
         return d
 
-    def get_dandisets(self) -> Iterator["RemoteDandiset"]:
-        for data in self.paginate("/dandisets/"):
+    def get_dandisets(
+        self, page_size: Optional[int] = None
+    ) -> Iterator["RemoteDandiset"]:
+        for data in self.paginate("/dandisets/", page_size=page_size):
             yield RemoteDandiset._make(self, data)
 
     def create_dandiset(self, name: str, metadata: Dict[str, Any]) -> "RemoteDandiset":
@@ -371,9 +505,9 @@ class RemoteDandiset(APIBase):
             _metadata=metadata,
         )
 
-    def get_versions(self) -> Iterator[Version]:
+    def get_versions(self, page_size: Optional[int] = None) -> Iterator[Version]:
         """Returns an iterator of all available `Version`\\s for the Dandiset"""
-        for v in self.client.paginate(f"{self.api_path}versions/"):
+        for v in self.client.paginate(f"{self.api_path}versions/", page_size=page_size):
             yield Version.parse_obj(v)
 
     def get_version(self, version_id: str) -> Version:
@@ -429,9 +563,13 @@ class RemoteDandiset(APIBase):
             }
         )
 
-    def get_assets(self, path=None) -> Iterator["RemoteAsset"]:
+    def get_assets(
+        self, path=None, page_size: Optional[int] = None
+    ) -> Iterator["RemoteAsset"]:
         """Returns an iterator of all assets in this version of the Dandiset"""
-        for a in self.client.paginate(f"{self.version_api_path}assets/"):
+        for a in self.client.paginate(
+            f"{self.version_api_path}assets/", page_size=page_size
+        ):
             yield self._mkasset(a)
 
     def get_asset(self, asset_id: str) -> "RemoteAsset":
@@ -444,13 +582,17 @@ class RemoteDandiset(APIBase):
             self.client.get(f"{self.version_api_path}assets/{asset_id}/")
         )
 
-    def get_assets_under_path(self, path: str) -> Iterator["RemoteAsset"]:
+    def get_assets_under_path(
+        self, path: str, page_size: Optional[int] = None
+    ) -> Iterator["RemoteAsset"]:
         """
         Returns an iterator of all assets in this version of the Dandiset whose
         `~RemoteAsset.path` attributes start with ``path``
         """
         for a in self.client.paginate(
-            f"{self.version_api_path}assets/", params={"path": path}
+            f"{self.version_api_path}assets/",
+            page_size=page_size,
+            params={"path": path},
         ):
             yield self._mkasset(a)
 
@@ -469,6 +611,29 @@ class RemoteDandiset(APIBase):
         else:
             return asset
 
+    def export_manifest(
+        self,
+        filepath: Union[str, Path],
+        with_digests: bool = False,
+        jobs: Optional[int] = None,
+    ) -> "AssetManifest":
+        """
+        Save a snapshot of the assets of this version of the Dandiset (their
+        paths, identifiers, sizes and modification times, plus digests if
+        ``with_digests`` is true) to a local manifest file, so that they could
+        be looked up later without querying the API; see `load_manifest()`.
+        Digests are fetched from asset metadata, using up to ``jobs`` threads.
+        """
+        return AssetManifest.write(self, filepath, with_digests=with_digests, jobs=jobs)
+
+    def load_manifest(self, filepath: Union[str, Path]) -> "AssetManifest":
+        """
+        Load a manifest of assets of this version of the Dandiset saved by
+        `export_manifest()`.  A `ValueError` is raised if it was saved for a
+        different Dandiset or version.
+        """
+        return AssetManifest(self, filepath)
+
     def download_directory(
         self,
         assets_dirpath: str,
@@ -793,6 +958,198 @@ class RemoteAsset(APIBase):
                 fp.write(chunk)
 
 
+class AssetManifest:
+    """
+    A local snapshot of the assets of a version of a Dandiset, as saved by
+    `RemoteDandiset.export_manifest()`
+
+    The snapshot is stored as JSON Lines: a header describing the Dandiset
+    version followed by a compact record for each asset.  Along with it, an
+    index of the byte offsets of the records by asset path is stored (in a file
+    with an additional ``.idx`` extension), so that only the index needs to be
+    loaded to look up an asset by its path.
+    """
+
+    def __init__(self, dandiset: RemoteDandiset, filepath: Union[str, Path]):
+        self.dandiset = dandiset
+        self.filepath = Path(filepath)
+        with self.filepath.open("rb") as fp:
+            self.header = json.loads(fp.readline())
+        if (self.header["dandiset_id"], self.header["version_id"]) != (
+            dandiset.identifier,
+            dandiset.version_id,
+        ):
+            raise ValueError(
+                f"Manifest {filepath} is for Dandiset"
+                f" {self.header['dandiset_id']}/{self.header['version_id']},"
+                f" not {dandiset.identifier}/{dandiset.version_id}"
+            )
+        if self.header["version_modified"] != dandiset.version.modified.isoformat():
+            lgr.warning(
+                "Dandiset %s/%s was modified since its manifest %s was saved",
+                dandiset.identifier,
+                dandiset.version_id,
+                filepath,
+            )
+        with self._get_index_path(self.filepath).open() as fp:
+            self._offsets: Dict[str, int] = json.load(fp)
+
+    @staticmethod
+    def _get_index_path(filepath: Path) -> Path:
+        return filepath.with_name(filepath.name + ".idx")
+
+    @classmethod
+    def write(
+        cls,
+        dandiset: RemoteDandiset,
+        filepath: Union[str, Path],
+        with_digests: bool = False,
+        jobs: Optional[int] = None,
+    ) -> "AssetManifest":
+        filepath = Path(filepath)
+        header = {
+            "dandiset_id": dandiset.identifier,
+            "version_id": dandiset.version_id,
+            "version_modified": dandiset.version.modified.isoformat(),
+            "api_url": dandiset.client.api_url,
+        }
+        if with_digests:
+            assets_metadata: Iterable[Tuple[RemoteAsset, Any]] = iter_assets_metadata(
+                dandiset.get_assets(), jobs=jobs
+            )
+        else:
+            assets_metadata = ((a, None) for a in dandiset.get_assets())
+        offsets = {}
+        with filepath.open("wb") as fp:
+            fp.write(json.dumps(header).encode("utf-8") + b"\n")
+            for asset, metadata in assets_metadata:
+                rec = {
+                    "asset_id": asset.identifier,
+                    "path": asset.path,
+                    "size": asset.size,
+                    "modified": asset.modified.isoformat(),
+                }
+                if metadata is not None:
+                    rec["digest"] = metadata.get("digest")
+                offsets[asset.path] = fp.tell()
+                fp.write(json.dumps(rec).encode("utf-8") + b"\n")
+        with cls._get_index_path(filepath).open("w") as fp:
+            json.dump(offsets, fp)
+        return cls(dandiset, filepath)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._offsets
+
+    def __iter__(self) -> Iterator[RemoteAsset]:
+        """Iterate over the assets in the order they were listed by the API"""
+        for rec in self.iter_records():
+            yield self._mkasset(rec)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the records of the assets as stored in the manifest"""
+        with self.filepath.open("rb") as fp:
+            fp.readline()  # header
+            for line in fp:
+                yield json.loads(line)
+
+    def get_record(self, path: str) -> Dict[str, Any]:
+        """
+        Return the stored record (with ``asset_id``, ``path``, ``size``,
+        ``modified``, and possibly ``digest`` fields) of the asset at ``path``.
+        If there is no such asset, a `NotFoundError` is raised.
+        """
+        try:
+            offset = self._offsets[path]
+        except KeyError:
+            raise NotFoundError(f"No asset at path {path!r}")
+        with self.filepath.open("rb") as fp:
+            fp.seek(offset)
+            return cast(Dict[str, Any], json.loads(fp.readline()))
+
+    def get_asset_by_path(self, path: str) -> RemoteAsset:
+        """
+        Return the asset whose `~RemoteAsset.path` equals ``path``.  If there is
+        no such asset, a `NotFoundError` is raised.
+        """
+        return self._mkasset(self.get_record(path))
+
+    def get_assets_under_path(self, path: str) -> Iterator[RemoteAsset]:
+        """Iterate over the assets whose paths start with ``path``"""
+        for rec in self.iter_records():
+            if rec["path"].startswith(path):
+                yield self._mkasset(rec)
+
+    def _mkasset(self, rec: Dict[str, Any]) -> RemoteAsset:
+        return self.dandiset._mkasset({k: v for k, v in rec.items() if k != "digest"})
+
+
+def iter_assets_metadata(
+    assets: Iterable[RemoteAsset], jobs: Optional[int] = None
+) -> Iterator[Tuple[RemoteAsset, Dict[str, Any]]]:
+    """
+    Fetch the raw metadata of the given assets concurrently, using up to
+    ``jobs`` threads, and yield ``(asset, metadata)`` pairs in the order of
+    ``assets``.  ``assets`` is consumed lazily (e.g., while the API is still
+    being paginated), and fetched metadata is cached on disk, keyed by the
+    identifier and modification time of the asset.
+    """
+    jobs = jobs or 5
+    get_metadata = _get_asset_metadata_getter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending: deque = deque()
+        for asset in assets:
+            pending.append((asset, executor.submit(get_metadata, asset)))
+            # Yield ready metadata as soon as possible, but do not let more
+            # than a bounded number of requests be in flight
+            while pending and (len(pending) >= 2 * jobs or pending[0][1].done()):
+                a, fut = pending.popleft()
+                yield a, fut.result()
+        while pending:
+            a, fut = pending.popleft()
+            yield a, fut.result()
+
+
+@lru_cache(maxsize=None)
+def _get_asset_metadata_getter() -> Callable[[RemoteAsset], Dict[str, Any]]:
+    # fscacher (via joblib) imports numpy, so the cache is set up only once it
+    # is needed, to keep the import of this module (and of the CLI) light
+    from fscacher import PersistentCache
+
+    cache = PersistentCache(name="dandi-asset-metadata", envvar="DANDI_CACHE")
+    fetch = cache.memoize(_fetch_asset_metadata, exclude_kwargs=["client", "api_path"])
+
+    def get_metadata(asset: RemoteAsset) -> Dict[str, Any]:
+        if asset._metadata is not None:
+            return asset._metadata
+        return cast(
+            Dict[str, Any],
+            fetch(
+                asset.client.api_url,
+                asset.identifier,
+                asset.modified.isoformat(),
+                client=asset.client,
+                api_path=asset.api_path,
+            ),
+        )
+
+    return get_metadata
+
+
+def _fetch_asset_metadata(
+    api_url: str,
+    asset_id: str,
+    modified: str,
+    *,
+    client: DandiAPIClient,
+    api_path: str,
+) -> Dict[str, Any]:
+    # api_url, asset_id and modified are the key for the cache
+    return cast(Dict[str, Any], client.get(api_path))
+
+
 def upload_part(storage_session, fp, lock, etagger, asset_path, part):
     etag_part = etagger.get_part(part["part_number"])
     if part["size"] != etag_part.size:
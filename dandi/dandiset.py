@@ -1,11 +1,19 @@
 """Classes/utilities for support of a dandiset"""
+
+from hashlib import sha256
+import os.path as op
 from pathlib import Path
 
 from dandischema.models import get_schema_version
 
 from . import get_logger
 from .consts import dandiset_metadata_file
-from .utils import find_parent_directory_containing, yaml_dump, yaml_load
+from .utils import (
+    PersistentFileIndex,
+    find_parent_directory_containing,
+    yaml_dump,
+    yaml_load,
+)
 
 lgr = get_logger()
 
@@ -135,3 +143,161 @@ class APIDandiset(Dandiset):
                     f"Unsupported schema version: {schema_version}; expected {current_version}"
                 )
         super().__init__(path, allow_empty=allow_empty)
+
+
+class DandisetState(PersistentFileIndex):
+    """
+    State of the files of a dandiset, as known from the last dandi operations
+    on them, persisted in the user cache directory
+
+    For every file, its identity (size, modification time and inode) is
+    recorded together with what was learned about it in that state: its
+    ``dandi-etag`` digest, the results of its validation (see
+    `~dandi.validate.ValidationIndex`), and the identifier of the remote asset
+    it was uploaded as or downloaded from.  Whenever the identity of a file
+    changes, all of that is forgotten.
+    """
+
+    _DESCRIPTION = "dandiset state"
+    _FIELDS = ("etag", "validation", "asset_id")
+
+    def __init__(self, dandiset_path):
+        self.dandiset_path = Path(dandiset_path).absolute()
+        # Versions of the validators the recorded validation results are from
+        self.validators = None
+        super().__init__(self.get_state_path(self.dandiset_path))
+
+    @staticmethod
+    def get_state_path(dandiset_path):
+        """
+        Return the path of the file to keep the state of the dandiset in, under
+        ``DANDI_STATE_DIR`` (the user cache directory by default)
+        """
+        from .consts import STATE_DIR
+
+        state_dir = STATE_DIR
+        if state_dir is None:
+            import appdirs
+
+            state_dir = op.join(
+                appdirs.user_cache_dir("dandi-cli", "dandi"), "dandisets"
+            )
+        key = sha256(str(Path(dandiset_path).absolute()).encode()).hexdigest()
+        return Path(state_dir, f"{key}.json")
+
+    @classmethod
+    def for_path(cls, path):
+        """Return the state of the dandiset containing ``path``, or None"""
+        dandiset_path = find_parent_directory_containing(
+            dandiset_metadata_file, Path(path).absolute()
+        )
+        return cls(dandiset_path) if dandiset_path is not None else None
+
+    def _load_records(self, data):
+        self.validators = data.get("validators")
+        return data["files"]
+
+    def _dump_records(self):
+        return {
+            "dandiset_path": str(self.dandiset_path),
+            "validators": self.validators,
+            "files": self._records,
+        }
+
+    def _key(self, filepath):
+        return Path(filepath).absolute().relative_to(self.dandiset_path).as_posix()
+
+    def set_validators(self, validators):
+        """
+        Declare the versions of the validators, forgetting all validation
+        results recorded with other ones
+        """
+        with self._lock:
+            if validators == self.validators:
+                return
+            if self.validators is not None:
+                lgr.debug("Validators changed; discarding validation results")
+            for rec in self._records.values():
+                rec["validation"] = None
+            self.validators = validators
+            self._modified = True
+
+    def get_record(self, filepath):
+        """
+        Return the record for the file, or None if there is none for its current
+        state
+        """
+        return self._get_current(self._key(filepath), filepath)
+
+    def get_etag(self, filepath):
+        """Return the recorded dandi-etag of the file in its current state"""
+        rec = self.get_record(filepath)
+        return rec["etag"] if rec is not None else None
+
+    def update(self, filepath, **fields):
+        """
+        Record ``fields`` (``etag``, ``validation``, ``asset_id``) for the file
+        in its current state
+        """
+        unknown = set(fields).difference(self._FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        identity = self.get_identity(filepath)
+        key = self._key(filepath)
+        with self._lock:
+            rec = self._records.get(key)
+            if rec is None or not self._is_same(rec, identity):
+                rec = {**identity, **{f: None for f in self._FIELDS}}
+            self._records[key] = {**rec, **fields}
+            self._modified = True
+
+    def remove(self, filepath):
+        """Forget the file, e.g. since it was removed"""
+        with self._lock:
+            if self._records.pop(self._key(filepath), None) is not None:
+                self._modified = True
+
+    def get_changes(self, entries, paths=None):
+        """Compare the recorded state with the current one
+
+        Parameters
+        ----------
+        entries: iterable of FileEntry
+          Files currently found under ``paths``
+        paths: list of paths, optional
+          Paths (within the dandiset) which were searched for the files, so
+          recorded files under them not among ``entries`` are reported as
+          deleted.  By default -- the whole dandiset.
+
+        Yields
+        ------
+        str, dict or None
+          POSIX path relative to the dandiset, and its record (None if "new").
+          Besides the recorded fields, a ``"status"`` is included, which is one
+          of "new", "modified", "deleted", or "unchanged".
+        """
+        seen = set()
+        for entry in entries:
+            key = self._key(entry)
+            seen.add(key)
+            rec = self._records.get(key)
+            if rec is None:
+                yield key, {"status": "new"}
+            elif self._is_same(rec, self.get_identity(entry)):
+                yield key, {**rec, "status": "unchanged"}
+            else:
+                yield key, {**rec, "status": "modified"}
+        prefixes = None
+        if paths is not None:
+            prefixes = []
+            for p in paths:
+                rp = self._key(p)
+                prefixes.append("" if rp == "." else rp + "/")
+        for key, rec in self._records.items():
+            if key in seen:
+                continue
+            if prefixes is not None and not any(
+                key.startswith(p) or key + "/" == p for p in prefixes
+            ):
+                continue
+            yield key, {**rec, "status": "deleted"}
@@ -14,7 +14,7 @@ import requests
 from . import get_logger
 from .consts import dandiset_metadata_file
 from .dandiarchive import DandisetURL, MultiAssetURL, SingleAssetURL, parse_dandi_url
-from .dandiset import Dandiset
+from .dandiset import Dandiset, DandisetState
 from .support.digests import get_digest
 from .support.pyout import naturalsize
 from .utils import (
@@ -62,8 +62,10 @@ def download(
     # same dandiset and use that dandiset path as the one to download under
     if isinstance(parsed_url, DandisetURL):
         output_path = op.join(output_dir, parsed_url.dandiset_id)
+        state = DandisetState(output_path)
     else:
         output_path = output_dir
+        state = None
 
     # dandi.cli.formatters are used in cmd_ls to provide switchable
     pyout_style = pyouts.get_style(hide_if_missing=False)
@@ -90,6 +92,7 @@ def download(
         existing=existing,
         get_metadata=get_metadata,
         get_assets=get_assets,
+        state=state,
         **kw,
     )
 
@@ -99,16 +102,20 @@ def download(
     #    has failed to download.  If any was: exception should probably be
     #    raised.  API discussion for Python side of API:
     #
-    if format == "debug":
-        for rec in gen_:
-            print(rec)
-            sys.stdout.flush()
-    elif format == "pyout":
-        with out:
+    try:
+        if format == "debug":
             for rec in gen_:
-                out(rec)
-    else:
-        raise ValueError(format)
+                print(rec)
+                sys.stdout.flush()
+        elif format == "pyout":
+            with out:
+                for rec in gen_:
+                    out(rec)
+        else:
+            raise ValueError(format)
+    finally:
+        if state is not None:
+            state.save()
 
     if sync and not isinstance(parsed_url, SingleAssetURL):
         with parsed_url.get_client() as client:
@@ -125,7 +132,7 @@ def download(
                 f"Unexpected URL type {type(parsed_url).__name__}"
             )
         to_delete = []
-        for p in find_files(".*", download_dir, exclude_datalad=True):
+        for p in find_files(".*", download_dir, exclude_datalad=True, jobs=jobs):
             if p == op.join(output_path, dandiset_metadata_file):
                 continue
             a_path = op.normpath(op.join(prefix, op.relpath(p, download_dir)))
@@ -147,6 +154,10 @@ def download(
                 elif opt == "yes":
                     for p in to_delete:
                         os.unlink(p)
+                        if state is not None:
+                            state.remove(p)
+                    if state is not None:
+                        state.save()
                     break
                 else:
                     break
@@ -161,6 +172,7 @@ def download_generator(
     existing="error",
     get_metadata=True,
     get_assets=True,
+    state=None,
 ):
     """A generator for downloads of files, folders, or entire dandiset from DANDI
     (as identified by URL)
@@ -175,6 +187,9 @@ def download_generator(
     assets_it: IteratorWithAggregation
       which will be set .gen to assets.  Purpose is to make it possible to get
       summary statistics while already downloading.  TODO: reimplement properly!
+    state: DandisetState, optional
+      State of the dandiset at ``output_path``, to record downloaded files in
+      and to avoid digesting unchanged files
 
     """
 
@@ -247,6 +262,8 @@ def download_generator(
                 mtime=mtime,
                 existing=existing,
                 digests=digests,
+                state=state,
+                asset_id=asset.identifier,
             )
 
             if yield_generator_for_fields:
@@ -415,6 +432,8 @@ def _download_file(
     mtime=None,
     existing="error",
     digests=None,
+    state=None,
+    asset_id=None,
 ):
     """Common logic for downloading a single file
 
@@ -435,6 +454,8 @@ def _download_file(
     digests: dict, optional
       possible checksums or other digests provided for the file. Only one
       will be used to verify download
+    state: DandisetState, optional
+      To record the downloaded file (as of the asset ``asset_id``) in
     """
     if op.lexists(path):
         block = f"File {path!r} already exists"
@@ -469,7 +490,9 @@ def _download_file(
                         "%s is in git-annex, and hash does not match hash on server; redownloading",
                         path,
                     )
-            elif get_digest(path, "dandi-etag") == digests["dandi-etag"]:
+            elif _get_etag(path, state) == digests["dandi-etag"]:
+                if state is not None:
+                    state.update(path, asset_id=asset_id)
                 yield _skip_file("already exists")
                 return
             else:
@@ -603,9 +626,21 @@ def _download_file(
         yield {"status": "setting mtime"}
         os.utime(path, (time.time(), ensure_datetime(mtime).timestamp()))
 
+    if state is not None and digests and "dandi-etag" in digests:
+        state.update(path, etag=digests["dandi-etag"], asset_id=asset_id)
     yield {"status": "done"}
 
 
+def _get_etag(path, state=None):
+    """Return dandi-etag of the file, as recorded in ``state`` if unchanged"""
+    etag = state.get_etag(path) if state is not None else None
+    if etag is None:
+        etag = get_digest(path, "dandi-etag")
+        if state is not None:
+            state.update(path, etag=etag)
+    return etag
+
+
 class DownloadDirectory:
     def __init__(self, filepath, digests):
         #: The path to which to save the file after downloading
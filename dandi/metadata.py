@@ -10,9 +10,9 @@ from . import __version__, get_logger
 from .dandiset import Dandiset
 from .pynwb_utils import (
     _get_pynwb_metadata,
-    get_neurodata_types,
-    get_nwb_version,
+    get_metadata_extractor,
     ignore_benign_pynwb_warnings,
+    inspect_nwb,
     metadata_cache,
 )
 from .utils import ensure_datetime, get_utcnow_datetime
@@ -47,45 +47,52 @@ def get_metadata(path):
             lgr.debug("Failed to get metadata for %s: %s", path, exc)
             return None
 
+    # Open the file once to collect everything we could without pynwb
+    inspection = inspect_nwb(path)
+
     # First read out possibly available versions of specifications for NWB(:N)
-    meta["nwb_version"] = get_nwb_version(path)
-
-    # PyNWB might fail to load because of missing extensions.
-    # There is a new initiative of establishing registry of such extensions.
-    # Not yet sure if PyNWB is going to provide "native" support for needed
-    # functionality: https://github.com/NeurodataWithoutBorders/pynwb/issues/1143
-    # So meanwhile, hard-coded workaround for data types we care about
-    ndtypes_registry = {
-        "AIBS_ecephys": "allensdk.brain_observatory.ecephys.nwb",
-        "ndx-labmetadata-abf": "ndx_dandi_icephys",
-    }
-    tried_imports = set()
-    while True:
-        try:
-            meta.update(_get_pynwb_metadata(path))
-            break
-        except KeyError as exc:  # ATM there is
-            lgr.debug("Failed to read %s: %s", path, exc)
-            res = re.match(r"^['\"\\]+(\S+). not a namespace", str(exc))
-            if not res:
-                raise
-            ndtype = res.groups()[0]
-            if ndtype not in ndtypes_registry:
-                raise ValueError(
-                    "We do not know which extension provides %s. "
-                    "Original exception was: %s. " % (ndtype, exc)
-                )
-            import_mod = ndtypes_registry[ndtype]
-            lgr.debug("Importing %r which should provide %r", import_mod, ndtype)
-            if import_mod in tried_imports:
-                raise RuntimeError(
-                    "We already tried importing %s to provide %s, but it seems it didn't help"
-                    % (import_mod, ndtype)
-                )
-            tried_imports.add(import_mod)
-            __import__(import_mod)
+    meta["nwb_version"] = inspection["nwb_version"]
 
-    meta["nd_types"] = get_neurodata_types(path)
+    if get_metadata_extractor() == "h5py" and inspection["metadata"] is not None:
+        meta.update(inspection["metadata"])
+    else:
+        # PyNWB might fail to load because of missing extensions.
+        # There is a new initiative of establishing registry of such extensions.
+        # Not yet sure if PyNWB is going to provide "native" support for needed
+        # functionality: https://github.com/NeurodataWithoutBorders/pynwb/issues/1143
+        # So meanwhile, hard-coded workaround for data types we care about
+        ndtypes_registry = {
+            "AIBS_ecephys": "allensdk.brain_observatory.ecephys.nwb",
+            "ndx-labmetadata-abf": "ndx_dandi_icephys",
+        }
+        tried_imports = set()
+        while True:
+            try:
+                meta.update(_get_pynwb_metadata(path))
+                break
+            except KeyError as exc:  # ATM there is
+                lgr.debug("Failed to read %s: %s", path, exc)
+                res = re.match(r"^['\"\\]+(\S+). not a namespace", str(exc))
+                if not res:
+                    raise
+                ndtype = res.groups()[0]
+                if ndtype not in ndtypes_registry:
+                    raise ValueError(
+                        "We do not know which extension provides %s. "
+                        "Original exception was: %s. " % (ndtype, exc)
+                    )
+                import_mod = ndtypes_registry[ndtype]
+                lgr.debug("Importing %r which should provide %r", import_mod, ndtype)
+                if import_mod in tried_imports:
+                    raise RuntimeError(
+                        "We already tried importing %s to provide %s, but it seems it didn't help"
+                        % (import_mod, ndtype)
+                    )
+                tried_imports.add(import_mod)
+                __import__(import_mod)
+
+    meta["nd_types"] = inspection["nd_types"]
+    meta["nd_type_modalities"] = inspection["nd_type_modalities"]
 
     return meta
 
@@ -660,33 +667,45 @@ def process_ndtypes(asset, nd_types):
 def nwb2asset(
     nwb_path, digest=None, digest_type=None, schema_version=None
 ) -> models.BareAsset:
+    current_version = models.get_schema_version()
     if schema_version is not None:
-        current_version = models.get_schema_version()
         if schema_version != current_version:
             raise ValueError(
                 f"Unsupported schema version: {schema_version}; expected {current_version}"
             )
     start_time = datetime.now().astimezone()
-    metadata = get_metadata(nwb_path)
+    asset = _get_nwb_asset_dict(nwb_path, current_version)
     if digest is not None:
-        metadata["digest"] = digest
-        metadata["digest_type"] = digest_type
-    metadata["contentSize"] = op.getsize(nwb_path)
-    metadata["encodingFormat"] = "application/x-nwb"
-    metadata["dateModified"] = get_utcnow_datetime()
-    metadata["blobDateModified"] = ensure_datetime(os.stat(nwb_path).st_mtime)
-    metadata["path"] = nwb_path
-    if metadata["blobDateModified"] > metadata["dateModified"]:
+        asset["digest"] = {models.DigestType[digest_type].value: digest}
+    asset["path"] = str(nwb_path)
+    asset["dateModified"] = get_utcnow_datetime()
+    asset["blobDateModified"] = ensure_datetime(os.stat(nwb_path).st_mtime)
+    if asset["blobDateModified"] > asset["dateModified"]:
         lgr.warning(
-            "mtime %s of %s is in the future", metadata["blobDateModified"], nwb_path
+            "mtime %s of %s is in the future", asset["blobDateModified"], nwb_path
         )
-    asset = metadata2asset(metadata)
-    asset = process_ndtypes(asset, metadata["nd_types"])
     end_time = datetime.now().astimezone()
-    if asset.wasGeneratedBy is None:
-        asset.wasGeneratedBy = []
-    asset.wasGeneratedBy.append(get_generator(start_time, end_time))
-    return asset
+    asset["wasGeneratedBy"] = asset.get("wasGeneratedBy", []) + [
+        get_generator(start_time, end_time)
+    ]
+    # The complete asset gets validated only once, upon model construction
+    return models.BareAsset(**asset)
+
+
+@metadata_cache.memoize_path
+def _get_nwb_asset_dict(nwb_path, schema_version):
+    """Return the (unvalidated) part of asset metadata which is the same
+    for every `nwb2asset` call on an unchanged file, as a JSON-able dict
+
+    `schema_version` is not used other than to key the cache.
+    """
+    metadata = get_metadata(nwb_path)
+    metadata["contentSize"] = op.getsize(nwb_path)
+    metadata["encodingFormat"] = "application/x-nwb"
+    metadata["path"] = str(nwb_path)
+    asset = extract_model(models.BareAsset, metadata)
+    asset = process_ndtypes(asset, metadata["nd_types"])
+    return asset.json_dict()
 
 
 def get_default_metadata(path, digest=None, digest_type=None) -> models.BareAsset:
@@ -3,19 +3,29 @@ ATM primarily a sandbox for some functionality for  dandi organize
 """
 
 import binascii
-from collections import Counter
-from copy import deepcopy
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
 import os
 import os.path as op
 from pathlib import Path
 import re
+import shutil
+from threading import Lock
 
 import numpy as np
 
 from . import get_logger
 from .exceptions import OrganizeImpossibleError
-from .pynwb_utils import get_neurodata_types_to_modalities_map, get_object_id
-from .utils import ensure_datetime, flattened, yaml_load
+from .pynwb_utils import get_neurodata_type_modality, inspect_nwb
+from .utils import (
+    PersistentFileIndex,
+    copy_file,
+    ensure_datetime,
+    flattened,
+    move_file,
+    yaml_load,
+)
 
 lgr = get_logger()
 
@@ -47,6 +57,77 @@ assert {v.get("type", "additional") for v in potential_fields.values()} == {
     "mandatory_if_not_empty",
 }
 dandi_path = op.join("sub-{subject_id}", "{dandi_filename}")
+# Fields included into the names only if they have different values among the
+# organized files
+_additional_fields = tuple(
+    f for f, rec in potential_fields.items() if rec.get("type") is None
+)
+
+
+def load_metadata(paths, jobs=None, devel_debug=False):
+    """Load metadata of the files in parallel processes
+
+    Files are dispatched to the worker processes in chunks, so that the
+    overhead of dispatching is amortized for files with metadata already
+    available from the cache of `get_metadata`.  A progress bar is shown while
+    loading.
+
+    Parameters
+    ----------
+    paths: list of str
+    jobs: int, optional
+      Number of processes to use.  If not specified -- as many as CPUs.
+    devel_debug: bool, optional
+      Load metadata sequentially in the current process
+
+    Returns
+    -------
+    list of (path, metadata, error)
+      In the order of `paths`.  `metadata` is None and `error` is the string
+      representation of the exception if metadata failed to load.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from tqdm import tqdm
+
+    from .pynwb_utils import ignore_benign_pynwb_warnings
+
+    jobs = jobs or os.cpu_count() or 1
+    with tqdm(
+        desc="Loading metadata", total=len(paths), unit="file", disable=None
+    ) as pbar:
+
+        def _progress(results):
+            nfailed = 0
+            for r in results:
+                if r[2] is not None:
+                    nfailed += 1
+                    pbar.set_postfix(failed=nfailed)
+                pbar.update(1)
+                yield r
+
+        if devel_debug or jobs == 1 or len(paths) < 2:
+            return list(_progress(map(_get_metadata_or_error, paths)))
+        # Several chunks per worker still keep them all busy till the end
+        chunksize = max(1, min(100, len(paths) // (4 * jobs)))
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=ignore_benign_pynwb_warnings
+        ) as executor:
+            return list(
+                _progress(
+                    executor.map(_get_metadata_or_error, paths, chunksize=chunksize)
+                )
+            )
+
+
+def _get_metadata_or_error(path):
+    from .metadata import get_metadata
+
+    try:
+        return path, get_metadata(path), None
+    except Exception as exc:
+        # Not all exceptions could be pickled to be passed from a worker
+        return path, None, f"{type(exc).__name__}: {exc}"
 
 
 def filter_invalid_metadata_rows(metadata_rows):
@@ -67,13 +148,17 @@ def filter_invalid_metadata_rows(metadata_rows):
     return valid, invalid
 
 
-def create_unique_filenames_from_metadata(metadata):
+def create_unique_filenames_from_metadata(metadata, organized=()):
     """Create unique filenames given metadata
 
     Parameters
     ----------
     metadata: list of dict
       List of metadata records
+    organized: list of dict, optional
+      Values of `_additional_fields` of the files organized before (as returned
+      by `OrganizeIndex.get_organized`), which are to be considered in deciding
+      which fields to include into the names, but are not renamed
 
     Returns
     -------
@@ -81,9 +166,10 @@ def create_unique_filenames_from_metadata(metadata):
       Adjusted metadata. A copy, which might have removed some metadata fields
       Do not rely on it being the same
     """
-    # need a deepcopy since we will be tuning fields, and there should be no
-    # side effects to original metadata
-    metadata = deepcopy(metadata)
+    # need a copy since we will be tuning fields, and there should be no
+    # side effects to original metadata.  Fields are only (re)assigned, never
+    # modified in place, so there is no need for a (costly) deepcopy
+    metadata = [dict(r) for r in metadata]
 
     # TODO this does not act in a greedy fashion
     # i.e., only using enough fields to ensure uniqueness of filenames, but that
@@ -116,7 +202,11 @@ def create_unique_filenames_from_metadata(metadata):
             if value:
                 r[field] = _sanitize_value(value, field)
 
-    _assign_dandi_names(metadata)
+    unique_values = _get_unique_values(metadata, potential_fields)
+    for r in organized:
+        for field in _additional_fields:
+            unique_values[field].add(_get_hashable(r.get(field)))
+    _assign_dandi_names(metadata, unique_values)
 
     non_unique = _get_non_unique_paths(metadata)
 
@@ -136,20 +226,21 @@ def create_unique_filenames_from_metadata(metadata):
             # The use case of 000022 - there is a common to many probes file (has many probe_ids)
             # but listing them all in filename -- does not scale, so we only limit to where
             # needs disambiguation.
-            # Cconsider conflicting groups and adjust their records
-            for conflicting_path, paths in non_unique.items():
+            # Consider conflicting groups and adjust their records.  Values of
+            # the "additional" fields do not change, so only names of the
+            # records in the adjusted groups need to be reassigned.
+            for records in _group_non_unique_records(metadata, non_unique).values():
                 # I think it might not work out entirely correctly if we have multiple
                 # instances of non-unique, but then will consider not within each group...
                 # yoh: TODO
-                values = _get_unique_values_among_non_unique(metadata, paths, field)
-                if values:  # helps disambiguation, but might still be non-unique
+                if any(not is_undefined(r.get(field)) for r in records):
+                    # helps disambiguation, but might still be non-unique
                     # add to all files in the group
-                    for r in metadata:
-                        if r["dandi_path"] == conflicting_path:
-                            r["_mandatory_if_not_empty"] = r.get(
-                                "_mandatory_if_not_empty", []
-                            ) + [field]
-                _assign_dandi_names(metadata)
+                    for r in records:
+                        r["_mandatory_if_not_empty"] = r.get(
+                            "_mandatory_if_not_empty", []
+                        ) + [field]
+                    _assign_dandi_names(records, unique_values)
             non_unique = _get_non_unique_paths(metadata)
             if not non_unique:
                 break
@@ -176,49 +267,54 @@ def _assign_obj_id(metadata, non_unique):
     msg = "%d out of %d paths are not unique" % (len(non_unique), len(metadata))
 
     lgr.info(msg + ". We will try adding _obj- based on crc32 of object_id")
-    seen_obj_ids = {}  # obj_id: object_id
-    seen_object_ids = {}  # object_id: path
-    recent_nwb_msg = "NWB>=2.1.0 standard (supported by pynwb>=1.1.0)."
+    object_ids = {}  # object_id: path
+    obj_ids = {}  # obj_id: object_id
     for r in metadata:
-        if r["dandi_path"] in non_unique:
-            try:
-                object_id = get_object_id(r["path"])
-            except KeyError:
-                raise OrganizeImpossibleError(
-                    msg
-                    + f". We tried to use object_id but it is absent in {r['path']!r}. "
-                    f"It is either not .nwb file or produced by older *nwb libraries. "
-                    f"You must re-save files e.g. using {recent_nwb_msg}"
-                )
+        if r["dandi_path"] not in non_unique:
+            continue
+        object_id = _get_object_id(r["path"], msg)
+        if object_id in object_ids:
+            raise OrganizeImpossibleError(
+                f"Two files ({r['path']!r} and {object_ids[object_id]!r}) "
+                f"have the same object_id {object_id}. Must not "
+                f"happen. Either files are duplicates (remove one) "
+                f"or were not saved correctly using {_recent_nwb_msg}"
+            )
+        # shorter version
+        obj_id = get_obj_id(object_id)
+        if obj_id in obj_ids:
+            seen_object_id = obj_ids[obj_id]
+            raise RuntimeError(
+                f"Wrong assumption by DANDI developers that first "
+                f"CRC32 checksum of object_id would be sufficient.  Please "
+                f"report: {obj_id} the same for "
+                f"{object_ids[seen_object_id]}={seen_object_id} "
+                f"{r['path']}={object_id} "
+            )
+        r["obj_id"] = obj_id
+        object_ids[object_id] = r["path"]
+        obj_ids[obj_id] = object_id
 
-            if not object_id:
-                raise OrganizeImpossibleError(
-                    msg
-                    + f". We tried to use object_id but it was {object_id!r} for {r['path']!r}. "
-                    f"You might need to re-save files using {recent_nwb_msg}"
-                )
-            # shorter version
-            obj_id = get_obj_id(object_id)
-            if obj_id in seen_obj_ids:
-                seen_object_id = seen_obj_ids[obj_id]
-                if seen_object_id == object_id:
-                    raise OrganizeImpossibleError(
-                        f"Two files ({r['path']!r} and {seen_object_ids[object_id]!r}) "
-                        f"have the same object_id {object_id}. Must not "
-                        f"happen. Either files are duplicates (remove one) "
-                        f"or were not saved correctly using {recent_nwb_msg}"
-                    )
-                else:
-                    raise RuntimeError(
-                        f"Wrong assumption by DANDI developers that first "
-                        f"CRC32 checksum of object_id would be sufficient.  Please "
-                        f"report: {obj_id} the same for "
-                        f"{seen_object_ids[seen_object_id]}={seen_object_id} "
-                        f"{r['path']}={object_id} "
-                    )
-            r["obj_id"] = obj_id
-            seen_obj_ids[obj_id] = object_id
-            seen_object_ids[object_id] = r["path"]
+
+_recent_nwb_msg = "NWB>=2.1.0 standard (supported by pynwb>=1.1.0)."
+
+
+def _get_object_id(path, msg):
+    # object_id is collected (and cached) while loading the metadata, so the
+    # file is not opened again unless the cache is disabled
+    object_id = inspect_nwb(path)["object_id"]
+    if object_id is None:
+        raise OrganizeImpossibleError(
+            msg + f". We tried to use object_id but it is absent in {path!r}. "
+            f"It is either not .nwb file or produced by older *nwb libraries. "
+            f"You must re-save files e.g. using {_recent_nwb_msg}"
+        )
+    if not object_id:
+        raise OrganizeImpossibleError(
+            msg + f". We tried to use object_id but it was {object_id!r} for {path!r}. "
+            f"You might need to re-save files using {_recent_nwb_msg}"
+        )
+    return object_id
 
 
 def _get_hashable(v):
@@ -229,15 +325,6 @@ def _get_hashable(v):
         return v
 
 
-def _get_unique_values_among_non_unique(metadata, non_unique_paths, field):
-    """Per each non-unique path return values"""
-    return {
-        _get_hashable(r.get(field))
-        for r in metadata
-        if (r["path"] in non_unique_paths) and not is_undefined(r.get(field))
-    }
-
-
 def get_obj_id(object_id):
     """Given full object_id, get its shortened version"""
     return np.base_repr(binascii.crc32(object_id.encode("ascii")), 36).lower()
@@ -248,8 +335,19 @@ def is_undefined(value):
     return value is None or (hasattr(value, "__len__") and not len(value))
 
 
-def _assign_dandi_names(metadata):
-    unique_values = _get_unique_values(metadata, potential_fields)
+def _assign_dandi_names(metadata, unique_values=None):
+    """Assign dandi_filename and dandi_path to the records
+
+    Parameters
+    ----------
+    metadata: list of dict
+    unique_values: dict, optional
+      Unique values of `potential_fields`, as returned by `_get_unique_values`,
+      among all the records being organized.  If not provided, computed from
+      `metadata`.
+    """
+    if unique_values is None:
+        unique_values = _get_unique_values(metadata, potential_fields)
     # unless it is mandatory, we would not include the fields with more than
     # a single unique field
     for r in metadata:
@@ -302,17 +400,21 @@ def _sanitize_value(value, field):
 
 
 def _populate_modalities(metadata):
-    ndtypes_to_modalities = get_neurodata_types_to_modalities_map()
     ndtypes_unassigned = set()
     for r in metadata:
         mods = set()
         nd_types = r.get("nd_types", [])
         if isinstance(nd_types, str):
             nd_types = nd_types.split(",")
+        # as resolved (for extensions too) from the file itself
+        nd_type_modalities = r.get("nd_type_modalities") or {}
         for nd_rec in nd_types:
             # split away the count
             ndtype = nd_rec.split()[0]
-            mod = ndtypes_to_modalities.get(ndtype, None)
+            if ndtype in nd_type_modalities:
+                mod = nd_type_modalities[ndtype]
+            else:
+                mod = get_neurodata_type_modality(ndtype)
             if mod:
                 if mod not in ("base", "device", "file", "misc"):
                     # skip some trivial/generic ones
@@ -456,7 +558,74 @@ number_of_cells: RECOMMENDED
         )
 
 
+class MetadataSummary:
+    """Summary of metadata records needed to populate dataset.yml
+
+    Records could be added one at a time as they become available (e.g. as
+    they are loaded in parallel), and summaries of different subsets of records
+    could be merged, so the records need not be kept around or traversed again.
+    """
+
+    FIELDS = (
+        "age",
+        "cell_id",
+        "experiment_description",
+        "related_publications",
+        "sex",
+        "species",
+        "subject_id",
+        "tissue_sample_id",
+        "slice_id",
+    )
+
+    def __init__(self, metadata=()):
+        self.count = 0
+        # non-empty values (lists cast to tuples) per field
+        self.unique_values = {f: set() for f in self.FIELDS}
+        self.age_min = None
+        self.age_max = None
+        for r in metadata:
+            self.add(r)
+
+    def add(self, record):
+        """Account for a metadata record"""
+        self.count += 1
+        for field in self.FIELDS:
+            v = record.get(field)
+            if v:
+                self.unique_values[field].add(_get_hashable(v))
+        age = record.get("age")
+        if age:
+            self._update_age(age, age)
+
+    def _update_age(self, age_min, age_max):
+        if self.age_min is None or age_min < self.age_min:
+            self.age_min = age_min
+        if self.age_max is None or age_max > self.age_max:
+            self.age_max = age_max
+
+    def merge(self, other):
+        """Account for the records summarized by another summary"""
+        self.count += other.count
+        for field, values in other.unique_values.items():
+            self.unique_values[field].update(values)
+        if other.age_min is not None:
+            self._update_age(other.age_min, other.age_max)
+        return self
+
+
+# leading and trailing characters to strip from publications
+_publication_strip_regex = re.compile("^[- \t'\"]|[- \t'\"]$")
+
+
 def populate_dataset_yml(filepath, metadata):
+    """Populate (possibly templated) dataset.yml with what is known from metadata
+
+    Parameters
+    ----------
+    filepath: str
+    metadata: list of dict or MetadataSummary
+    """
     # To preserve comments, let's use ruamel
     import ruamel.yaml
 
@@ -474,21 +643,9 @@ def populate_dataset_yml(filepath, metadata):
         rec = {}
 
     # Let's use available metadata for at least some of the fields
-    uvs = _get_unique_values(
-        metadata,
-        (
-            "age",
-            "cell_id",
-            "experiment_description",
-            "related_publications",
-            "sex",
-            "species",
-            "subject_id",
-            "tissue_sample_id",
-            "slice_id",
-        ),
-        filter_=True,
-    )
+    if not isinstance(metadata, MetadataSummary):
+        metadata = MetadataSummary(metadata)
+    uvs = metadata.unique_values
 
     DEFAULT_VALUES = ("REQUIRED", "RECOMMENDED", "OPTIONAL")
 
@@ -501,8 +658,8 @@ def populate_dataset_yml(filepath, metadata):
             # so duplicating TODO
             rec["age"] = {"units": "TODO"}
         age = rec["age"]
-        age["minimum"] = min(uvs["age"])
-        age["maximum"] = max(uvs["age"])
+        age["minimum"] = metadata.age_min
+        age["maximum"] = metadata.age_max
         if age.get("units", None) in (None,) + DEFAULT_VALUES:  # template
             age.pop("units", None)
             age.insert(2, "units", "TODO", comment="REQUIRED")
@@ -531,15 +688,17 @@ def populate_dataset_yml(filepath, metadata):
     if uvs["experiment_description"] and is_undefined(rec, "description"):
         rec["description"] = "\n".join(sorted(uvs["experiment_description"]))
 
-    for v in sorted(flattened(uvs["related_publications"] or [])):
+    publications = sorted(flattened(uvs["related_publications"]))
+    if publications:
         if "publications" not in rec:
             rec["publications"] = []
-        # TODO: better harmonization
-        strip_regex = "[- \t'\"]"
-        v = re.sub("^" + strip_regex, "", v)
-        v = re.sub(strip_regex + "$", "", v)
-        if v not in rec["publications"]:
-            rec["publications"].append(v)
+        seen = set(rec["publications"])
+        for v in publications:
+            # TODO: better harmonization
+            v = _publication_strip_regex.sub("", v)
+            if v not in seen:
+                seen.add(v)
+                rec["publications"].append(v)
 
     # Save result
     with open(filepath, "w") as f:
@@ -558,21 +717,31 @@ def _get_non_unique_paths(metadata):
     dict:
        of dandi_path: list(orig paths)
     """
-    # Verify that we got unique paths
-    all_paths = [m["dandi_path"] for m in metadata]
-    all_paths_unique = set(all_paths)
-    non_unique = {}
-    if not len(all_paths) == len(all_paths_unique):
-        counts = Counter(all_paths)
-        non_unique = {p: c for p, c in counts.items() if c > 1}
-        # Let's prepare informative listing
-        for p in non_unique:
-            orig_paths = []
-            for e in metadata:
-                if e["dandi_path"] == p:
-                    orig_paths.append(e["path"])
-            non_unique[p] = orig_paths  # overload with the list instead of count
-    return non_unique
+    return {
+        p: [r["path"] for r in records]
+        for p, records in _group_non_unique_records(metadata).items()
+    }
+
+
+def _group_non_unique_records(metadata, dandi_paths=None):
+    """Group records by their dandi_path, for the paths shared by multiple records
+
+    Parameters
+    ----------
+    metadata: list of dict
+    dandi_paths: collection of str, optional
+      If provided, only records with these dandi_paths are considered
+
+    Returns
+    -------
+    dict:
+       of dandi_path: list(records), in the order of `metadata`
+    """
+    groups = defaultdict(list)
+    for r in metadata:
+        if dandi_paths is None or r["dandi_path"] in dandi_paths:
+            groups[r["dandi_path"]].append(r)
+    return {p: records for p, records in groups.items() if len(records) > 1}
 
 
 def detect_link_type(workdir):
@@ -613,3 +782,544 @@ def detect_link_type(workdir):
             srcfile.unlink()
         except FileNotFoundError:
             pass
+
+
+class OrganizeIndex(PersistentFileIndex):
+    """Persistent mapping of organized files to their paths within a dandiset
+
+    It is stored as JSON under the dandiset's top directory, and is used by an
+    incremental organize to process only the files which are new or changed
+    (as judged by their size, mtime, and inode) since they were organized, and
+    to guarantee that their new paths do not conflict with the ones of the
+    files organized before.
+    """
+
+    FILENAME = op.join(".dandi", "organize.json")
+    _DESCRIPTION = "organize index"
+
+    def __init__(self, dandiset_path):
+        self.dandiset_path = Path(dandiset_path).absolute()
+        super().__init__(self.dandiset_path / self.FILENAME)
+
+    @staticmethod
+    def _key(filepath):
+        return op.abspath(filepath)
+
+    def get_dandi_path(self, filepath):
+        """Return the path the file was organized to, or None if it is new or
+        changed since then"""
+        rec = self._get_current(self._key(filepath), filepath)
+        return rec["dandi_path"] if rec is not None else None
+
+    def get_organized(self, exclude=()):
+        """Return records of the files organized before and still present in
+        the dandiset
+
+        Parameters
+        ----------
+        exclude: list of str
+          Files to not return records for, e.g. since they are to be organized
+          anew
+
+        Returns
+        -------
+        list of dict
+          With the ``path`` of the file, its ``dandi_path``, and the values of
+          `_additional_fields` it was organized with
+        """
+        exclude = set(map(self._key, exclude))
+        return [
+            {
+                **rec.get("name_fields", {}),
+                "path": path,
+                "dandi_path": rec["dandi_path"],
+            }
+            for path, rec in self._records.items()
+            if path not in exclude
+            and op.lexists(self.dandiset_path / rec["dandi_path"])
+        ]
+
+    def was_organized_to(self, filepath, dandi_path):
+        """Whether the file (possibly in its previous state) was organized to
+        ``dandi_path``"""
+        rec = self._records.get(self._key(filepath))
+        return rec is not None and rec["dandi_path"] == dandi_path
+
+    def check_conflicts(self, metadata):
+        """Verify that dandi_paths of the records do not collide with the paths
+        of other files organized before and still present in the dandiset
+
+        Raises
+        ------
+        OrganizeImpossibleError
+        """
+        taken = {
+            rec["dandi_path"]: path
+            for path, rec in self._records.items()
+            if op.lexists(self.dandiset_path / rec["dandi_path"])
+        }
+        conflicts = []
+        for r in metadata:
+            other = taken.get(r["dandi_path"])
+            if other is not None and other != self._key(r["path"]):
+                conflicts.append(f"{r['path']} and {other} -> {r['dandi_path']}")
+        if conflicts:
+            raise OrganizeImpossibleError(
+                "%d files would be organized to the paths of the files organized "
+                "before:\n%s%s\nPlease adjust/provide metadata in your .nwb files "
+                "to disambiguate, or organize all files anew (not incrementally)"
+                % (
+                    len(conflicts),
+                    "\n".join("   " + c for c in conflicts[:10]),
+                    "\n   ..." if len(conflicts) > 10 else "",
+                )
+            )
+
+    def record(self, filepath, dandi_path, name_fields=None):
+        """Record that the file in its current state is organized to
+        ``dandi_path``, given values of `_additional_fields` in
+        ``name_fields``"""
+        rec = {
+            **self.get_identity(filepath),
+            "dandi_path": dandi_path,
+            "name_fields": name_fields or {},
+        }
+        with self._lock:
+            self._records[self._key(filepath)] = rec
+            self._modified = True
+
+
+class OrganizeJournal:
+    """Journal of the file actions performed by organize
+
+    Completed actions are appended to it (as JSON lines) as soon as they are
+    done, and the journal is removed once all actions succeed.  If a run fails,
+    the journal remains, so that the next run could skip the actions done
+    already, or the actions could be rolled back.
+    """
+
+    FILENAME = op.join(".dandi", "organize-journal.jsonl")
+    # where files replaced by the actions are kept until the run succeeds
+    BACKUP_DIR = op.join(".dandi", "organize-replaced")
+
+    def __init__(self, dandiset_path):
+        self.dandiset_path = op.abspath(dandiset_path)
+        self.filepath = Path(dandiset_path, self.FILENAME)
+        self._done = {}  # target: (action, source), in the order of completion
+        self._lock = Lock()
+        self._fp = None
+        try:
+            with open(self.filepath) as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        # e.g. the last line was not written completely
+                        continue
+                    self._done[rec["target"]] = (rec["action"], rec["source"])
+        except FileNotFoundError:
+            pass
+        if self._done:
+            lgr.info(
+                "Found journal %s of a failed run with %d completed actions",
+                self.filepath,
+                len(self._done),
+            )
+
+    def __len__(self):
+        return len(self._done)
+
+    @staticmethod
+    def _normalize(action, source, target):
+        if action != "symlink":  # the content of a link is kept as is
+            source = op.abspath(source)
+        return action, source, op.abspath(target)
+
+    def is_done(self, action, source, target):
+        """Whether the action producing ``target`` from ``source`` was done
+
+        An action which produced ``target`` differently (e.g. from another
+        source, in a run with different inputs) is not considered done.
+        """
+        action, source, target = self._normalize(action, source, target)
+        return self._done.get(target) == (action, source)
+
+    def record(self, action, source, target):
+        """Record a completed action"""
+        action, source, target = self._normalize(action, source, target)
+        line = json.dumps({"action": action, "source": source, "target": target})
+        with self._lock:
+            if self._fp is None:
+                self.filepath.parent.mkdir(parents=True, exist_ok=True)
+                self._fp = open(self.filepath, "a")
+            self._fp.write(line + "\n")
+            self._fp.flush()
+            self._done[target] = (action, source)
+
+    def set_aside(self, target):
+        """Move an existing ``target`` out of the way of an action
+
+        It is restored by `rollback`, and removed once all actions succeed.
+        """
+        backup = op.join(
+            self.dandiset_path,
+            self.BACKUP_DIR,
+            op.relpath(op.abspath(target), self.dandiset_path),
+        )
+        # recorded beforehand, since rollback skips moves which were not done
+        self.record("move", target, backup)
+        os.makedirs(op.dirname(backup), exist_ok=True)
+        move_file(target, backup)
+
+    def close(self, success):
+        """Close the journal, removing it if all actions were successful"""
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        if success:
+            shutil.rmtree(
+                op.join(self.dandiset_path, self.BACKUP_DIR), ignore_errors=True
+            )
+            try:
+                self.filepath.unlink()
+            except FileNotFoundError:
+                pass
+            else:
+                try:
+                    # do not leave behind .dandi/ we might have created
+                    self.filepath.parent.rmdir()
+                except OSError:
+                    pass
+            self._done.clear()
+
+    def rollback(self):
+        """Undo the recorded actions, in reverse order, and remove the journal"""
+        for target, (action, source) in reversed(list(self._done.items())):
+            if action == "move":
+                if not op.lexists(source) and op.lexists(target):
+                    os.makedirs(op.dirname(source), exist_ok=True)
+                    move_file(target, source)
+            elif op.lexists(target):
+                os.unlink(target)
+            lgr.debug("Rolled back %s of %s to %s", action, source, target)
+        self.close(success=True)
+
+
+_file_actions = {
+    "copy": copy_file,
+    "hardlink": os.link,
+    "move": move_file,
+    "symlink": os.symlink,
+}
+
+
+def execute_file_actions(actions, jobs=None, journal=None):
+    """Perform file actions in parallel threads
+
+    Parameters
+    ----------
+    actions: list of (action, source, target)
+      ``action`` is one of "copy", "hardlink", "move", or "symlink".  For
+      "symlink" ``source`` is the content of the link.
+    jobs: int, optional
+      Number of threads.  If not specified -- as `ThreadPoolExecutor` decides.
+    journal: OrganizeJournal, optional
+      To skip the actions done already and to record completed ones
+
+    Returns
+    -------
+    int
+      Number of performed actions.  If any action fails, the exception is
+      raised once the ones already started complete, and no new actions are
+      started.
+    """
+    if journal is not None:
+        actions = [a for a in actions if not journal.is_done(*a)]
+    # Create all directories up front, instead of checking for them per file
+    for d in sorted({op.dirname(target) for _, _, target in actions}):
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+    def act(action, source, target):
+        lgr.debug("%s %s %s", action, source, target)
+        _file_actions[action](source, target)
+        if journal is not None:
+            journal.record(action, source, target)
+
+    ndone = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(act, *a) for a in actions]
+        try:
+            for fut in as_completed(futures):
+                fut.result()
+                ndone += 1
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            raise
+    return ndone
+
+
+class OrganizePlan:
+    """File actions planned by `plan_organize`, to be performed by `execute_plan`
+
+    Every item of the plan is a dict with
+
+    - path: the file to organize
+    - dandi_path: its path within the dandiset
+    - target: its full path within the dandiset
+    - action: "copy", "hardlink", "move", or "symlink" (or "dry" if planned in
+      the "dry" files mode), or "skip" if nothing is to be done
+    - source: what the action is to be performed with; differs from ``path``
+      only for "symlink", for which it is the content of the link
+    - replace: whether the target is to be replaced, since it was organized
+      from a previous state of the file
+    - reason: why the action (or its absence) was chosen
+    - name_fields: values of `_additional_fields` the name was chosen with
+
+    A plan could be saved (as JSON) and executed later, possibly elsewhere,
+    since all paths in a saved plan are absolute.
+    """
+
+    def __init__(self, dandiset_path, files_mode, items=None, incremental=False):
+        self.dandiset_path = dandiset_path
+        self.files_mode = files_mode
+        self.items = items if items is not None else []
+        self.incremental = incremental
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def get_actions(self):
+        """Return the items for which some action is to be done"""
+        return [i for i in self.items if i["action"] != "skip"]
+
+    def save(self, filepath):
+        def absolute(item):
+            item = dict(item, path=op.abspath(item["path"]))
+            item["target"] = op.abspath(item["target"])
+            if item["action"] != "symlink":
+                item["source"] = op.abspath(item["source"])
+            return item
+
+        with open(filepath, "w") as f:
+            json.dump(
+                {
+                    "dandiset_path": op.abspath(self.dandiset_path),
+                    "files_mode": self.files_mode,
+                    "incremental": self.incremental,
+                    "items": list(map(absolute, self.items)),
+                },
+                f,
+                indent=1,
+            )
+
+    @classmethod
+    def load(cls, filepath):
+        with open(filepath) as f:
+            data = json.load(f)
+        return cls(
+            data["dandiset_path"],
+            data["files_mode"],
+            items=data["items"],
+            incremental=data["incremental"],
+        )
+
+
+def _list_directories(dirpaths):
+    """Return names of entries of the directories, listing each one once"""
+    listings = {}  # dirpath: {name: DirEntry}, empty if absent
+    for d in dirpaths:
+        if d in listings:
+            continue
+        try:
+            with os.scandir(d or os.curdir) as it:
+                listings[d] = {e.name: e for e in it}
+        except (FileNotFoundError, NotADirectoryError):
+            listings[d] = {}
+    return listings
+
+
+def plan_organize(
+    metadata, dandiset_path, files_mode, organize_index=None, journal=None
+):
+    """Plan file actions to organize files into a dandiset, without acting
+
+    Parameters
+    ----------
+    metadata: list of dict
+      Records of the files with their ``dandi_path`` assigned, as returned by
+      `create_unique_filenames_from_metadata`
+    dandiset_path: str
+    files_mode: str
+      One of `file_operation_modes` other than "auto"
+    organize_index: OrganizeIndex, optional
+      For an incremental organize -- targets organized from previous states
+      of the files are to be replaced
+    journal: OrganizeJournal, optional
+      Targets done by a failed run are not considered to be conflicting
+
+    Returns
+    -------
+    OrganizePlan
+
+    Raises
+    ------
+    AssertionError
+      If some targets already exist (and are not the same files)
+    """
+    targets = [op.join(dandiset_path, e["dandi_path"]) for e in metadata]
+    # Check existence of all targets with one listing per directory
+    listings = _list_directories(op.dirname(t) for t in targets)
+
+    def lexists(target):
+        return op.basename(target) in listings[op.dirname(target)]
+
+    def exists(target):
+        entry = listings[op.dirname(target)].get(op.basename(target))
+        # the target of a symlink is to be checked
+        return entry is not None and (not entry.is_symlink() or op.exists(target))
+
+    # we should take additional care about paths if both top_path and
+    # provided paths are relative
+    use_abs_paths = op.isabs(dandiset_path) or any(
+        op.isabs(e["path"]) for e in metadata
+    )
+    if files_mode == "simulate":
+        action = "symlink"
+    elif files_mode in ("dry", "symlink", "hardlink", "copy", "move"):
+        action = files_mode
+    else:
+        raise NotImplementedError(files_mode)
+    plan = OrganizePlan(
+        dandiset_path, files_mode, incremental=organize_index is not None
+    )
+    for e, dandi_fullpath in zip(metadata, targets):
+        dandi_abs_fullpath = op.abspath(dandi_fullpath)
+        dandi_dirpath = op.dirname(dandi_fullpath)  # could be sub-... subdir
+
+        e_path = e["path"]
+        e_abs_path = e_path
+
+        if not op.isabs(e_path):
+            e_abs_path = op.abspath(e_path)
+            if use_abs_paths:
+                e_path = e_abs_path
+            elif files_mode == "symlink":  # path should be relative to the target
+                e_path = op.relpath(e_abs_path, dandi_dirpath)
+
+        item = {
+            "path": e["path"],
+            "dandi_path": e["dandi_path"],
+            "target": dandi_fullpath,
+            "action": action,
+            "source": e_path,
+            "replace": False,
+            "reason": "organize",
+            "name_fields": {f: e.get(f) for f in _additional_fields},
+        }
+        if dandi_abs_fullpath == e_abs_path:
+            lgr.debug("Skipping %s since the same in source/destination", e_path)
+            item.update(action="skip", reason="same path")
+        elif files_mode == "symlink" and op.realpath(dandi_abs_fullpath) == op.realpath(
+            e_abs_path
+        ):
+            lgr.debug(
+                "Skipping %s since mode is symlink and both resolve to the same path",
+                e_path,
+            )
+            item.update(action="skip", reason="symlink resolves to the same path")
+        elif organize_index is not None and lexists(dandi_fullpath):
+            # organized from a previous state of the file (verified below)
+            item.update(replace=True, reason="organized before from a changed file")
+        plan.items.append(item)
+
+    # Verify that the target paths do not exist yet, and fail if they do
+    # Note: in "simulate" mode we do early check as well, so this would be
+    # duplicate but shouldn't hurt
+    existing = []
+    for e, item in zip(metadata, plan.items):
+        dandi_fullpath = item["target"]
+        if exists(dandi_fullpath):
+            # It might be the same file, then we would not complain
+            if (
+                not (op.realpath(e["path"]) == op.realpath(dandi_fullpath))
+                and not (
+                    # Would be replaced since it is from a previous state of the file
+                    organize_index is not None
+                    and organize_index.was_organized_to(e["path"], e["dandi_path"])
+                )
+                and not (
+                    # Done by a failed run being resumed
+                    journal is not None
+                    and journal.is_done(item["action"], item["source"], dandi_fullpath)
+                )
+            ):
+                existing.append(dandi_fullpath)
+            # TODO: it might happen that with "move" we are renaming files
+            # so there is an existing, which also gets moved away "first"
+    if existing:
+        raise AssertionError(
+            "%d paths already exist: %s%s.  Remove them first."
+            % (
+                len(existing),
+                ", ".join(existing[:5]),
+                " and more" if len(existing) > 5 else "",
+            )
+        )
+    return plan
+
+
+def execute_plan(plan, jobs=None):
+    """Perform file actions of the plan
+
+    Actions are recorded in the `OrganizeJournal` of the dandiset, so a failed
+    run could be resumed or rolled back, and for an incremental plan the
+    organized files are recorded in the `OrganizeIndex` of the dandiset.
+
+    Returns
+    -------
+    list of dict
+      Items of the plan which were acted upon
+    """
+    items = plan.get_actions()
+    if any(i["action"] == "dry" for i in items):
+        raise ValueError("Plans of the 'dry' mode cannot be executed")
+    journal = OrganizeJournal(plan.dandiset_path)
+    if items:
+        success = False
+        try:
+            for i in items:
+                if (
+                    i["replace"]
+                    and op.lexists(i["target"])
+                    and not journal.is_done(i["action"], i["source"], i["target"])
+                ):
+                    lgr.debug("Replacing %s organized before", i["target"])
+                    journal.set_aside(i["target"])
+            execute_file_actions(
+                [(i["action"], i["source"], i["target"]) for i in items],
+                jobs=jobs,
+                journal=journal,
+            )
+            success = True
+        finally:
+            journal.close(success)
+            if not success:
+                lgr.error(
+                    "Organize failed after %d out of %d file actions.  Rerun it "
+                    "to resume, or use --rollback to undo them",
+                    len(journal),
+                    len(items),
+                )
+    if plan.incremental and plan.files_mode != "simulate":
+        organize_index = OrganizeIndex(plan.dandiset_path)
+        for i in plan:
+            # the file is at its target now if it was moved
+            organized_path = i["target"] if plan.files_mode == "move" else i["path"]
+            organize_index.record(organized_path, i["dandi_path"], i.get("name_fields"))
+        organize_index.save()
+    return items
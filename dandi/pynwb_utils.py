@@ -1,5 +1,7 @@
 from collections import Counter
 from distutils.version import LooseVersion
+from functools import lru_cache
+import json
 import os
 import os.path as op
 import re
@@ -16,10 +18,12 @@ import semantic_version
 from . import __version__, get_logger
 from .consts import (
     metadata_nwb_computed_fields,
+    metadata_nwb_extractor,
+    metadata_nwb_extractors,
     metadata_nwb_file_fields,
     metadata_nwb_subject_fields,
 )
-from .utils import get_module_version
+from .utils import ensure_datetime, get_module_version
 
 lgr = get_logger()
 
@@ -30,6 +34,8 @@ dandi_cache_tokens = [
     dandi_rel_version,
     get_module_version(hdmf),
     get_module_version(h5py),
+    # results of different extractors must not be reused for each other
+    metadata_nwb_extractor,
 ]
 metadata_cache = PersistentCache(
     name="dandi-metadata", tokens=dandi_cache_tokens, envvar="DANDI_CACHE"
@@ -90,20 +96,64 @@ def get_nwb_version(filepath, sanitize=False):
     str or None
        None if there is no version detected
     """
+    with h5py.File(filepath, "r") as h5file:
+        return _read_nwb_version(h5file, sanitize=sanitize)
+
+
+def _read_nwb_version(h5file, sanitize=False):
     _sanitize = _sanitize_nwb_version if sanitize else lambda v: v
 
-    with h5py.File(filepath, "r") as h5file:
-        # 2.x stored it as an attribute
-        try:
-            return _sanitize(h5file.attrs["nwb_version"])
-        except KeyError:
-            pass
+    # 2.x stored it as an attribute
+    try:
+        return _sanitize(h5file.attrs["nwb_version"])
+    except KeyError:
+        pass
+
+    # 1.x stored it as a dataset
+    try:
+        return _sanitize(h5file["nwb_version"][...].tostring().decode())
+    except Exception:
+        lgr.debug("%s has no nwb_version" % h5file.filename)
+
+
+@metadata_cache.memoize_path
+def inspect_nwb(filepath):
+    """Collect everything dandi needs to know about an .nwb file in one pass
+
+    The file is opened (via h5py) only once, and the (cached) result is
+    shared by the metadata extraction and validation code paths.
 
-        # 1.x stored it as a dataset
+    Returns
+    -------
+    dict
+      with the keys
+
+      - nwb_version: as returned by `get_nwb_version` (not sanitized)
+      - metadata: as returned by `_get_h5py_metadata`, i.e. None if pynwb
+        needs to be used to extract metadata from this file
+      - nd_types: as returned by `get_neurodata_types`
+      - nd_type_modalities: dict mapping each neurodata type within the file to
+        its modality (or None), see `get_neurodata_type_modality`.  Types
+        defined by extensions are given the modality of the core type they
+        extend, according to the specifications cached in the file itself
+      - object_id: value of the ``object_id`` attribute, or None if absent
+    """
+    with h5py.File(filepath, "r") as h5file:
         try:
-            return _sanitize(h5file["nwb_version"][...].tostring().decode())
-        except Exception:
-            lgr.debug("%s has no nwb_version" % filepath)
+            metadata = _read_h5py_metadata(h5file)
+        except Exception as exc:
+            lgr.debug("Failed to read metadata from %s via h5py: %s", filepath, exc)
+            metadata = None
+        nd_types = _read_neurodata_types(h5file)
+        return {
+            "nwb_version": _read_nwb_version(h5file),
+            "metadata": metadata,
+            "nd_types": nd_types,
+            "nd_type_modalities": _read_neurodata_type_modalities(
+                h5file, [r.split()[0] for r in nd_types]
+            ),
+            "object_id": h5file.attrs.get("object_id"),
+        }
 
 
 def get_neurodata_types_to_modalities_map():
@@ -111,16 +161,22 @@ def get_neurodata_types_to_modalities_map():
 
     It is an ugly hack, largely to check feasibility.
     It would base modality on the filename within pynwb providing that neural
-    data type
+    data type.
+
+    The map is computed once per process (for the version of pynwb in use), and
+    a copy of it is returned.  Types from extensions are not included, see
+    `inspect_nwb`.
     """
+    return dict(_get_neurodata_types_to_modalities_map(get_module_version(pynwb)))
+
+
+@lru_cache()
+def _get_neurodata_types_to_modalities_map(pynwb_version):
     import inspect
 
     ndtypes = {}
 
-    # TODO: if there are extensions, they might have types subclassed from the base
-    # types.  There might be a map within pynwb (pynwb.get_type_map?) to return
-    # known extensions. We would need to go along MRO to the base to figure out
-    # "modality"
+    # Types of extensions are resolved from the files themselves by inspect_nwb
     #
     # They import all submods within __init__
     for a, v in pynwb.__dict__.items():
@@ -149,16 +205,81 @@ def get_neurodata_types_to_modalities_map():
     return ndtypes
 
 
+def get_neurodata_type_modality(ndtype):
+    """Return the modality of a neurodata type known to pynwb, or None
+
+    Types defined by extensions are not known here, since the extensions
+    loaded into the process vary.  See ``nd_type_modalities`` of `inspect_nwb`
+    for the ones resolved from the specifications cached within a file.
+    """
+    # the cached map itself (not a copy), which must not be modified
+    ndtypes = _get_neurodata_types_to_modalities_map(get_module_version(pynwb))
+    return ndtypes.get(ndtype)
+
+
+def _read_neurodata_type_modalities(h5file, nd_types):
+    ndtypes = _get_neurodata_types_to_modalities_map(get_module_version(pynwb))
+    bases = None
+    modalities = {}
+    for ndtype in nd_types:
+        base = ndtype
+        seen = set()
+        while base is not None and base not in ndtypes and base not in seen:
+            if bases is None:
+                bases = _read_neurodata_type_bases(h5file)
+            seen.add(base)
+            base = bases.get(base)
+        if base is not None and base != ndtype:
+            lgr.debug("Resolved %s as a %s", ndtype, base)
+        modalities[ndtype] = ndtypes.get(base)
+    return modalities
+
+
+def _read_neurodata_type_bases(h5file):
+    """Map neurodata types to the types they extend
+
+    According to the specifications of the namespaces cached within the file
+    (under ``/specifications/<namespace>/<version>/<source>``).
+    """
+    bases = {}
+
+    def collect(spec):
+        if isinstance(spec, dict):
+            if spec.get("neurodata_type_def") and spec.get("neurodata_type_inc"):
+                bases[spec["neurodata_type_def"]] = spec["neurodata_type_inc"]
+            values = spec.values()
+        elif isinstance(spec, list):
+            values = spec
+        else:
+            return
+        for v in values:
+            collect(v)
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            try:
+                collect(json.loads(obj[()]))
+            except (TypeError, ValueError) as exc:
+                lgr.debug("Failed to load specification %s: %s", obj.name, exc)
+
+    specifications = h5file.get("specifications")
+    if isinstance(specifications, h5py.Group):
+        specifications.visititems(visit)
+    return bases
+
+
 @metadata_cache.memoize_path
 def get_neurodata_types(filepath):
     with h5py.File(filepath, "r") as h5file:
-        all_pairs = _scan_neurodata_types(h5file)
+        return _read_neurodata_types(h5file)
+
+
+def _read_neurodata_types(h5file):
+    counts = _count_neurodata_types(h5file)
+    counts.pop("NWBFile", None)
 
     # so far descriptions are useless so let's just output actual names only
     # with a count if there is multiple
-    # return [': '.join(filter(bool, p)) for p in all_pairs]
-    names = [p[0] for p in all_pairs if p[0] not in {"NWBFile"}]
-    counts = Counter(names)
     out = []
     for name, count in sorted(counts.items()):
         if count > 1:
@@ -168,14 +289,35 @@ def get_neurodata_types(filepath):
     return out
 
 
-def _scan_neurodata_types(grp):
-    out = []
-    if "neurodata_type" in grp.attrs:
-        out.append((grp.attrs["neurodata_type"], grp.attrs.get("description", None)))
-    for v in list(grp.values()):
-        if isinstance(v, h5py._hl.group.Group):
-            out += _scan_neurodata_types(v)
-    return out
+def _count_neurodata_types(h5file):
+    """Count the neurodata_type's of all groups within an HDF5 file
+
+    Uses a single (non-recursive) H5Ovisit pass over the objects of the file,
+    without instantiating h5py objects for them.  Datasets are skipped
+    entirely, and each object is visited once, regardless of how many links
+    point to it.
+    """
+    counts = Counter()
+    fid = h5file.id
+
+    def visit(name, info):
+        if info.type != h5py.h5o.TYPE_GROUP or not info.num_attrs:
+            return
+        if not h5py.h5a.exists(fid, b"neurodata_type", obj_name=name):
+            return
+        attr = h5py.h5a.open(fid, b"neurodata_type", obj_name=name)
+        value = np.zeros(attr.shape, dtype=attr.dtype)
+        attr.read(value, mtype=h5py.h5t.py_create(attr.dtype))
+        value = value[()]
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        counts[value] += 1
+
+    # h5py does not pass the root group itself to the callback
+    if "neurodata_type" in h5file.attrs:
+        counts[_get_h5py_attr(h5file, "neurodata_type")] += 1
+    h5py.h5o.visit(fid, visit, info=True)
+    return counts
 
 
 def _get_pynwb_metadata(path):
@@ -229,6 +371,121 @@ def _get_pynwb_metadata(path):
     return out
 
 
+# Locations (within NWB 2.x files) of the fields extracted by
+# _get_h5py_metadata, as HDF5 paths relative to the root
+_h5py_metadata_paths = {
+    "experiment_description": "general/experiment_description",
+    "experimenter": "general/experimenter",
+    "identifier": "identifier",
+    "institution": "general/institution",
+    "keywords": "general/keywords",
+    "lab": "general/lab",
+    "related_publications": "general/related_publications",
+    "session_description": "session_description",
+    "session_id": "general/session_id",
+    "session_start_time": "session_start_time",
+}
+# pynwb returns these as tuples, even if they were stored as scalars
+_h5py_tuple_fields = ("experimenter", "related_publications")
+_h5py_datetime_fields = ("session_start_time", "date_of_birth")
+# DynamicTables whose lengths are reported as number_of_* fields
+_h5py_table_paths = {
+    "electrodes": "general/extracellular_ephys/electrodes",
+    "units": "units",
+}
+
+
+def get_metadata_extractor():
+    """Return the name of the configured .nwb metadata extractor
+
+    It is "h5py" by default, and could be set via the
+    ``DANDI_METADATA_EXTRACTOR`` environment variable.
+    """
+    if metadata_nwb_extractor not in metadata_nwb_extractors:
+        raise ValueError(
+            f"Unknown metadata extractor {metadata_nwb_extractor!r}; expected"
+            f" one of: {', '.join(metadata_nwb_extractors)}"
+        )
+    return metadata_nwb_extractor
+
+
+def _get_h5py_metadata(path):
+    """Extract the same metadata as _get_pynwb_metadata, directly via h5py
+
+    Avoids construction of the complete NWBFile, which is costly. Returns None
+    if the file requires pynwb to be loaded correctly (e.g. it is not an NWB
+    2.x file or contains DANDI-specific lab metadata).
+    """
+    with h5py.File(path, "r") as h5file:
+        return _read_h5py_metadata(h5file)
+
+
+def _read_h5py_metadata(h5file):
+    version = h5file.attrs.get("nwb_version")
+    if isinstance(version, bytes):
+        version = version.decode("utf-8")
+    if not (isinstance(version, str) and version.startswith(("2.", "NWB-2."))):
+        lgr.debug("%s: nwb_version %r is not 2.x", h5file.filename, version)
+        return None
+    general = h5file.get("general", {})
+    for name in general:
+        if _get_h5py_attr(general[name], "neurodata_type") == "DandiIcephysMetadata":
+            lgr.debug("%s: has DandiIcephysMetadata", h5file.filename)
+            return None
+
+    out = {}
+    for key in metadata_nwb_file_fields:
+        out[key] = _get_h5py_field(h5file, _h5py_metadata_paths[key], key)
+    for subject_feature in metadata_nwb_subject_fields:
+        out[subject_feature] = _get_h5py_field(
+            h5file, f"general/subject/{subject_feature}", subject_feature
+        )
+
+    probe_ids = []
+    for device in general.get("devices", {}).values():
+        if "probe_id" in device.attrs:
+            probe_ids.append(device.attrs["probe_id"].item())
+        elif "probe_id" in device:
+            probe_ids.append(device["probe_id"][()].item())
+    if probe_ids:
+        out["probe_ids"] = probe_ids
+
+    for f in metadata_nwb_computed_fields:
+        if f in ("nwb_version", "nd_types"):
+            continue
+        if not f.startswith("number_of_"):
+            raise NotImplementedError(
+                "ATM can only compute number_of_ fields. Got {}".format(f)
+            )
+        table = h5file.get(_h5py_table_paths[f[len("number_of_") :]])
+        out[f] = len(table["id"]) if table is not None and "id" in table else 0
+
+    return out
+
+
+def _get_h5py_attr(obj, name):
+    value = obj.attrs.get(name)
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _get_h5py_field(h5file, h5path, key):
+    dataset = h5file.get(h5path)
+    if not isinstance(dataset, h5py.Dataset):
+        return None
+    value = dataset[()]
+    if isinstance(value, np.ndarray):
+        value = [v.decode("utf-8") if isinstance(v, bytes) else v for v in value]
+    elif isinstance(value, bytes):
+        value = value.decode("utf-8")
+    elif isinstance(value, np.generic):
+        value = value.item()
+    if key in _h5py_tuple_fields:
+        value = tuple(value) if isinstance(value, list) else (value,)
+    elif key in _h5py_datetime_fields:
+        value = ensure_datetime(value)
+    return value
+
+
 @validate_cache.memoize_path
 def validate(path, devel_debug=False):
     """Run validation on a file and return errors
@@ -264,7 +521,7 @@ def validate(path, devel_debug=False):
         r"incorrect shape - expected an array of shape .\[None\]."
     )
     try:
-        version = get_nwb_version(path, sanitize=False)
+        version = inspect_nwb(path)["nwb_version"]
     except Exception:
         # we just will not remove any errors, it is required so should be some
         pass
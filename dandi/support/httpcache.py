@@ -0,0 +1,192 @@
+"""On-disk cache of JSON responses to HTTP GET requests"""
+
+from hashlib import sha256
+import json
+import os
+import os.path as op
+from pathlib import Path
+import shutil
+from threading import Lock
+import time
+import uuid
+
+from .. import get_logger
+
+lgr = get_logger()
+
+
+class HTTPCache:
+    """
+    A cache of JSON bodies of responses, stored together with their validators
+    (``ETag`` and ``Last-Modified`` headers)
+
+    Cached responses are revalidated via conditional requests, unless they were
+    marked as immutable when stored and are not older than ``ttl`` seconds.
+    Whenever the total size of the cache exceeds ``max_size`` bytes, the least
+    recently used entries are removed.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_size=512 * 1024 * 1024):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._size = None  # computed upon first store
+        self._lock = Lock()
+
+    @staticmethod
+    def get_key(url, params=None, authorization=None):
+        """Return the key for a request with given URL, params and credentials"""
+        items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        # Responses might differ across users, so credentials (in a hashed form)
+        # are a part of the key too
+        return sha256(json.dumps([url, items, authorization]).encode()).hexdigest()
+
+    def _get_path(self, key):
+        return self.path / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Return the cache entry for ``key``, or `None` if there is none"""
+        path = self._get_path(key)
+        try:
+            with path.open() as fp:
+                entry = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            lgr.debug("Ignoring unreadable HTTP cache entry %s: %s", path, exc)
+            return None
+        try:
+            # Mark as recently used for the eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        """Whether the entry can be used without revalidating it with the server"""
+        return entry["immutable"] and time.time() - entry["time"] < self.ttl
+
+    @staticmethod
+    def get_conditional_headers(entry):
+        """Return the headers for a request revalidating the entry"""
+        headers = {}
+        if entry["etag"] is not None:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"] is not None:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key, url, headers, body, immutable=False):
+        """
+        Store the JSON ``body`` of a response with the given ``headers``.
+        Responses without validators are stored only if ``immutable``.
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (immutable or etag is not None or last_modified is not None):
+            return
+        self._write(
+            key,
+            {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "immutable": immutable,
+                "time": time.time(),
+                "body": body,
+            },
+        )
+
+    def refresh(self, key, entry):
+        """Record that the entry was successfully revalidated with the server"""
+        entry = dict(entry, time=time.time())
+        self._write(key, entry)
+        return entry
+
+    def _write(self, key, entry):
+        path = self._get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write atomically, since multiple threads or processes might be
+        # storing the same response
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with tmp.open("w") as fp:
+                json.dump(entry, fp)
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)
+        except OSError as exc:
+            lgr.debug("Failed to store HTTP cache entry %s: %s", path, exc)
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._get_total_size()
+            else:
+                self._size += path.stat().st_size - old_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _iter_entries(self):
+        for dirpath, _, filenames in os.walk(self.path):
+            for fname in filenames:
+                if fname.endswith(".json"):
+                    try:
+                        st = os.stat(op.join(dirpath, fname))
+                    except OSError:
+                        continue
+                    yield op.join(dirpath, fname), st
+
+    def _get_total_size(self):
+        return sum(st.st_size for _, st in self._iter_entries())
+
+    def _evict(self):
+        # Remove the least recently used entries until (a tenth of the maximal
+        # size) below the limit, so that eviction does not happen on every store
+        target = self.max_size * 0.9
+        entries = sorted(self._iter_entries(), key=lambda e: e[1].st_mtime)
+        self._size = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if self._size <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            self._size -= st.st_size
+        lgr.debug("Evicted HTTP cache entries down to %d bytes", self._size)
+
+    def clear(self):
+        if self.path.exists():
+            shutil.rmtree(self.path, ignore_errors=True)
+        with self._lock:
+            self._size = 0
+
+
+def get_http_cache():
+    """
+    Return the `HTTPCache` configured via ``DANDI_HTTP_CACHE*`` environment
+    variables, or `None` if the cache is not enabled.  As for other caches,
+    ``DANDI_CACHE=ignore`` disables and ``DANDI_CACHE=clear`` clears it.
+    """
+    from ..consts import (
+        HTTP_CACHE,
+        HTTP_CACHE_DIR,
+        HTTP_CACHE_MAX_SIZE,
+        HTTP_CACHE_TTL,
+    )
+
+    cache_control = os.environ.get("DANDI_CACHE")
+    if not HTTP_CACHE or cache_control == "ignore":
+        return None
+    path = HTTP_CACHE_DIR
+    if path is None:
+        import appdirs
+
+        path = op.join(appdirs.user_cache_dir("dandi-cli", "dandi"), "http")
+    cache = HTTPCache(path, ttl=HTTP_CACHE_TTL, max_size=HTTP_CACHE_MAX_SIZE)
+    if cache_control == "clear":
+        cache.clear()
+    return cache
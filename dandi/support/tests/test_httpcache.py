@@ -0,0 +1,82 @@
+import json
+
+import responses
+
+from ..httpcache import HTTPCache, get_http_cache
+from ... import consts
+from ...dandiapi import DandiAPIClient, RESTFullAPIClient
+
+
+def add_etagged_endpoint(url, body, etag='"v1"'):
+    def callback(request):
+        if request.headers.get("If-None-Match") == etag:
+            return (304, {"ETag": etag}, "")
+        return (200, {"ETag": etag}, json.dumps(body))
+
+    responses.add_callback(responses.GET, url, callback=callback)
+
+
+@responses.activate
+def test_revalidation(tmp_path):
+    add_etagged_endpoint("https://test.nil/api/things/", {"things": [1, 2]})
+    client = RESTFullAPIClient("https://test.nil/api", cache=HTTPCache(tmp_path))
+    for _ in range(3):
+        assert client.get("/things/") == {"things": [1, 2]}
+    assert [c.response.status_code for c in responses.calls] == [200, 304, 304]
+    assert "If-None-Match" not in responses.calls[0].request.headers
+    # different parameters -- a different entry
+    assert client.get("/things/", params={"page": 1}) == {"things": [1, 2]}
+    assert responses.calls[-1].response.status_code == 200
+
+
+@responses.activate
+def test_no_validators(tmp_path):
+    responses.add(responses.GET, "https://test.nil/api/things/", json={"a": 1})
+    client = RESTFullAPIClient("https://test.nil/api", cache=HTTPCache(tmp_path))
+    for _ in range(2):
+        assert client.get("/things/") == {"a": 1}
+    assert len(responses.calls) == 2
+    assert not list(tmp_path.iterdir())
+
+
+@responses.activate
+def test_published_version_ttl(tmp_path):
+    published = "https://test.nil/api/dandisets/000001/versions/0.210101.0000/info/"
+    draft = "https://test.nil/api/dandisets/000001/versions/draft/info/"
+    responses.add(responses.GET, published, json={"version": "0.210101.0000"})
+    add_etagged_endpoint(draft, {"version": "draft"})
+    client = DandiAPIClient("https://test.nil/api")
+    client.cache = HTTPCache(tmp_path)
+    for _ in range(2):
+        assert client.get(published) == {"version": "0.210101.0000"}
+        assert client.get(draft) == {"version": "draft"}
+    assert [c.request.url for c in responses.calls] == [published, draft, draft]
+    # expired
+    client.cache.ttl = 0
+    assert client.get(published) == {"version": "0.210101.0000"}
+    assert len(responses.calls) == 4
+
+
+def test_eviction(tmp_path):
+    cache = HTTPCache(tmp_path, max_size=10000)
+    for i in range(50):
+        cache.store(str(i), f"https://test.nil/{i}", {"ETag": "x"}, {"x": "y" * 900})
+        # keep the first entry in use
+        assert cache.get("0") is not None
+    sizes = [p.stat().st_size for p in tmp_path.glob("*/*.json")]
+    assert sum(sizes) <= 10000
+    assert cache.get("0") is not None
+    assert cache.get("1") is None
+    assert cache.get("49") is not None
+
+
+def test_get_http_cache(monkeypatch, tmp_path):
+    monkeypatch.delenv("DANDI_CACHE", raising=False)
+    monkeypatch.setattr(consts, "HTTP_CACHE", False)
+    assert get_http_cache() is None
+    monkeypatch.setattr(consts, "HTTP_CACHE", True)
+    monkeypatch.setattr(consts, "HTTP_CACHE_DIR", str(tmp_path))
+    cache = get_http_cache()
+    assert cache.path == tmp_path
+    monkeypatch.setenv("DANDI_CACHE", "ignore")
+    assert get_http_cache() is None
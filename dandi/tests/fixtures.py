@@ -15,7 +15,7 @@ import pytest
 import requests
 
 from .skip import skipif
-from .. import get_logger
+from .. import consts, get_logger
 from ..cli.command import organize
 from ..consts import dandiset_metadata_file, known_instances
 from ..dandiapi import DandiAPIClient
@@ -30,6 +30,14 @@ def capture_all_logs(caplog):
     caplog.set_level(logging.DEBUG, logger="dandi")
 
 
+@pytest.fixture(scope="session", autouse=True)
+def dandi_state_dir(tmp_path_factory):
+    # Keep the state of dandisets created by tests out of the user cache
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr(consts, "STATE_DIR", str(tmp_path_factory.mktemp("dandi-state")))
+        yield
+
+
 # TODO: move into some common fixtures.  We might produce a number of files
 #       and also carry some small ones directly in git for regression testing
 @pytest.fixture(scope="session")
@@ -1,15 +1,27 @@
 import builtins
+import json
 import os.path
 from pathlib import Path
 import random
 from shutil import rmtree
+from urllib.parse import parse_qs, urlparse
+import uuid
 
 import click
+import pytest
+import responses
 
 from .. import dandiapi
 from ..consts import dandiset_metadata_file
-from ..dandiapi import DandiAPIClient
+from ..dandiapi import (
+    DandiAPIClient,
+    RemoteAsset,
+    RemoteDandiset,
+    RESTFullAPIClient,
+    iter_assets_metadata,
+)
 from ..download import download
+from ..exceptions import NotFoundError
 from ..upload import upload
 from ..utils import find_files
 
@@ -282,3 +294,201 @@ def test_get_content_url_follow_one_redirects_strip_query(monkeypatch):
             "https://dandiarchive.s3.amazonaws.com/blobs/2db/af0/2dbaf0fd-5003"
             "-4a0a-b4c0-bc8cdbdb3826"
         )
+
+
+@pytest.fixture
+def tmp_asset_metadata_cache(monkeypatch, tmp_path):
+    # Keep the cache of asset metadata out of the user cache directory
+    import fscacher
+
+    PersistentCache = fscacher.PersistentCache
+    monkeypatch.setattr(
+        fscacher,
+        "PersistentCache",
+        lambda name, **kwargs: PersistentCache(path=tmp_path / name, **kwargs),
+    )
+    dandiapi._get_asset_metadata_getter.cache_clear()
+    yield tmp_path
+    dandiapi._get_asset_metadata_getter.cache_clear()
+
+
+@responses.activate
+def test_iter_assets_metadata(tmp_asset_metadata_cache):
+    client = DandiAPIClient("https://test.nil/api")
+    assets = []
+    for i in range(7):
+        asset = RemoteAsset(
+            client=client,
+            dandiset_id="000000",
+            version_id="draft",
+            asset_id=str(uuid.uuid4()),
+            path=f"sub-{i}/sub-{i}.nwb",
+            size=i,
+            modified="2021-06-01T12:00:00Z",
+            # the metadata of the first asset is known already
+            metadata={"path": "sub-0/sub-0.nwb"} if i == 0 else None,
+        )
+        if i:
+            responses.add(
+                responses.GET,
+                client.get_url(asset.api_path),
+                json={"path": asset.path},
+            )
+        assets.append(asset)
+    for _ in range(2):
+        assert [
+            (a.path, meta["path"])
+            for a, meta in iter_assets_metadata(iter(assets), jobs=2)
+        ] == [(a.path, a.path) for a in assets]
+    # the second listing is served from the cache (unless caching is disabled)
+    if os.environ.get("DANDI_CACHE") != "ignore":
+        assert len(responses.calls) == 6
+        assert (tmp_asset_metadata_cache / "dandi-asset-metadata").exists()
+
+
+def add_paginated_endpoint(url, items, default_page_size=5, with_count=True):
+    def callback(request):
+        query = parse_qs(urlparse(request.url).query)
+        page = int(query.get("page", ["1"])[0])
+        page_size = int(query.get("page_size", [default_page_size])[0])
+        results = items[(page - 1) * page_size : page * page_size]
+        if page > 1 and not results:
+            return (404, {}, '{"detail": "Invalid page."}')
+        body = {"results": results, "next": None}
+        if page * page_size < len(items):
+            body["next"] = f"{url}?page={page + 1}&page_size={page_size}"
+        if with_count:
+            body["count"] = len(items)
+        return (200, {}, json.dumps(body))
+
+    responses.add_callback(responses.GET, url, callback=callback)
+
+
+@responses.activate
+@pytest.mark.parametrize("with_count", [True, False])
+@pytest.mark.parametrize("page_size", [None, 3, 23, 100])
+def test_paginate(with_count, page_size):
+    items = [{"id": i} for i in range(23)]
+    add_paginated_endpoint("https://test.nil/api/things/", items, with_count=with_count)
+    client = RESTFullAPIClient("https://test.nil/api")
+    assert list(client.paginate("/things/", page_size=page_size, jobs=2)) == items
+    assert len(responses.calls) == -(-len(items) // (page_size or 5))
+
+
+@responses.activate
+def test_paginate_shrinking():
+    items = [{"id": i} for i in range(23)]
+    add_paginated_endpoint("https://test.nil/api/things/", items)
+    client = RESTFullAPIClient("https://test.nil/api")
+    it = client.paginate("/things/", jobs=1)
+    assert next(it) == items[0]
+    # Items disappear in the middle of the pagination
+    del items[10:]
+    with pytest.raises(RuntimeError):
+        list(it)
+
+
+@responses.activate
+def test_paginate_growing():
+    items = [{"id": i} for i in range(23)]
+    add_paginated_endpoint("https://test.nil/api/things/", items)
+    client = RESTFullAPIClient("https://test.nil/api")
+    it = client.paginate("/things/", jobs=1)
+    assert next(it) == items[0]
+    items.insert(0, {"id": -1})
+    with pytest.raises(RuntimeError):
+        list(it)
+
+
+@responses.activate
+def test_paginate_cursor():
+    # Pages not numbered as ?page=N are listed by following the next links
+    items = [{"id": i} for i in range(23)]
+    url = "https://test.nil/api/things/"
+
+    def callback(request):
+        query = parse_qs(urlparse(request.url).query)
+        start = int(query.get("cursor", ["0"])[0])
+        body = {"results": items[start : start + 5], "count": len(items)}
+        body["next"] = f"{url}?cursor={start + 5}" if start + 5 < len(items) else None
+        return (200, {}, json.dumps(body))
+
+    responses.add_callback(responses.GET, url, callback=callback)
+    client = RESTFullAPIClient("https://test.nil/api")
+    assert list(client.paginate("/things/", jobs=2)) == items
+    assert len(responses.calls) == 5
+
+
+def make_test_dandiset(client, version_id="0.210101.0000"):
+    version = {
+        "version": version_id,
+        "name": "Test Dandiset",
+        "asset_count": 3,
+        "size": 6,
+        "created": "2021-01-01T00:00:00Z",
+        "modified": "2021-01-01T00:00:00Z",
+    }
+    return RemoteDandiset._make(
+        client,
+        {
+            "identifier": "000001",
+            "created": "2021-01-01T00:00:00Z",
+            "modified": "2021-01-01T00:00:00Z",
+            "most_recent_published_version": version,
+            "draft_version": dict(version, version="draft"),
+        },
+    )
+
+
+@responses.activate
+@pytest.mark.parametrize("with_digests", [False, True])
+def test_asset_manifest(tmp_path, with_digests):
+    client = DandiAPIClient("https://test.nil/api")
+    dandiset = make_test_dandiset(client)
+    items = [
+        {
+            "asset_id": str(uuid.uuid4()),
+            "path": path,
+            "size": len(path),
+            "modified": "2021-01-01T00:00:00Z",
+        }
+        for path in ["sub-1/sub-1.nwb", "sub-2/sub-2.nwb", "sub-10/sub-10.nwb"]
+    ]
+    add_paginated_endpoint(f"{client.api_url}{dandiset.version_api_path}assets/", items)
+    for it in items:
+        responses.add(
+            responses.GET,
+            f"{client.api_url}{dandiset.version_api_path}assets/{it['asset_id']}/",
+            json={"path": it["path"], "digest": {"dandi:dandi-etag": it["path"]}},
+        )
+    manifest_path = tmp_path / "manifest.jsonl"
+    dandiset.export_manifest(manifest_path, with_digests=with_digests)
+    ncalls = len(responses.calls)
+
+    manifest = dandiset.load_manifest(manifest_path)
+    assert len(manifest) == 3
+    assert "sub-2/sub-2.nwb" in manifest
+    assert "sub-2" not in manifest
+    assert [a.path for a in manifest] == [it["path"] for it in items]
+    asset = manifest.get_asset_by_path("sub-10/sub-10.nwb")
+    assert asset.identifier == items[2]["asset_id"]
+    assert asset.size == len("sub-10/sub-10.nwb")
+    assert asset.api_path == (
+        f"/dandisets/000001/versions/0.210101.0000/assets/{asset.identifier}/"
+    )
+    rec = manifest.get_record("sub-1/sub-1.nwb")
+    if with_digests:
+        assert rec["digest"] == {"dandi:dandi-etag": "sub-1/sub-1.nwb"}
+    else:
+        assert "digest" not in rec
+    assert [a.path for a in manifest.get_assets_under_path("sub-1")] == [
+        "sub-1/sub-1.nwb",
+        "sub-10/sub-10.nwb",
+    ]
+    with pytest.raises(NotFoundError):
+        manifest.get_asset_by_path("sub-3/sub-3.nwb")
+    # No API requests were needed
+    assert len(responses.calls) == ncalls
+
+    with pytest.raises(ValueError):
+        make_test_dandiset(client, "0.210202.0000").load_manifest(manifest_path)
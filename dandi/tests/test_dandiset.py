@@ -1,4 +1,8 @@
-from ..dandiset import Dandiset
+import pytest
+
+from ..consts import dandiset_metadata_file
+from ..dandiset import Dandiset, DandisetState
+from ..utils import find_file_entries
 
 
 def test_get_dandiset_record():
@@ -6,3 +10,52 @@ def test_get_dandiset_record():
     # Should have only header with "DO NOT EDIT"
     assert out.startswith("# DO NOT EDIT")
     assert "000000" in out
+
+
+def test_dandiset_state(tmp_path):
+    (tmp_path / dandiset_metadata_file).write_text("identifier: '000000'\n")
+    (tmp_path / "sub-1").mkdir()
+    for name in ["a.nwb", "b.nwb", "c.nwb"]:
+        (tmp_path / "sub-1" / name).write_text(name)
+    state = DandisetState(tmp_path)
+    assert state.get_record(tmp_path / "sub-1" / "a.nwb") is None
+    state.update(tmp_path / "sub-1" / "a.nwb", etag="etag-a", asset_id="A")
+    state.update(tmp_path / "sub-1" / "b.nwb", etag="etag-b")
+    valid = {"schema_version": None, "errors": []}
+    state.update(tmp_path / "sub-1" / "b.nwb", validation=valid)
+    state.update(tmp_path / "sub-1" / "c.nwb", etag="etag-c")
+    with pytest.raises(ValueError):
+        state.update(tmp_path / "sub-1" / "c.nwb", digest="wrong")
+    state.save()
+
+    state = DandisetState.for_path(tmp_path / "sub-1")
+    assert len(state) == 3
+    assert state.get_etag(tmp_path / "sub-1" / "a.nwb") == "etag-a"
+    assert state.get_record(tmp_path / "sub-1" / "b.nwb")["validation"] == valid
+    assert state.get_record(tmp_path / "sub-1" / "b.nwb")["etag"] == "etag-b"
+    # changed file -- nothing is known about it
+    (tmp_path / "sub-1" / "b.nwb").write_text("changed content")
+    assert state.get_etag(tmp_path / "sub-1" / "b.nwb") is None
+    (tmp_path / "sub-1" / "c.nwb").unlink()
+    (tmp_path / "sub-1" / "d.nwb").write_text("d")
+    changes = dict(state.get_changes(find_file_entries(r"\.nwb\Z", [str(tmp_path)])))
+    assert {path: rec["status"] for path, rec in changes.items()} == {
+        "sub-1/a.nwb": "unchanged",
+        "sub-1/b.nwb": "modified",
+        "sub-1/c.nwb": "deleted",
+        "sub-1/d.nwb": "new",
+    }
+    assert changes["sub-1/a.nwb"]["asset_id"] == "A"
+    # deleted only among the given paths
+    changes = dict(state.get_changes([], [tmp_path / "sub-2"]))
+    assert changes == {}
+    # modified file gets a new record
+    state.update(tmp_path / "sub-1" / "b.nwb", etag="etag-b2")
+    assert state.get_record(tmp_path / "sub-1" / "b.nwb")["validation"] is None
+    state.remove(tmp_path / "sub-1" / "c.nwb")
+    assert len(state) == 2
+    # validation results are forgotten whenever validators change
+    state.update(tmp_path / "sub-1" / "a.nwb", validation=valid)
+    state.set_validators(["1.0"])
+    assert state.get_record(tmp_path / "sub-1" / "a.nwb")["validation"] is None
+    assert state.get_etag(tmp_path / "sub-1" / "a.nwb") == "etag-a"
@@ -11,10 +11,17 @@ from dandischema.metadata import (
 )
 from dandischema.models import BareAsset as BareAssetMeta
 from dandischema.models import Dandiset as DandisetMeta
+from dandischema.models import DigestType
 from dateutil.tz import tzutc
 import pytest
 
-from ..metadata import get_metadata, metadata2asset, parse_age, timedelta2duration
+from ..metadata import (
+    get_metadata,
+    metadata2asset,
+    nwb2asset,
+    parse_age,
+    timedelta2duration,
+)
 from ..pynwb_utils import metadata_nwb_subject_fields
 
 METADATA_DIR = Path(__file__).with_name("data") / "metadata"
@@ -33,6 +40,7 @@ def test_get_metadata(simple1_nwb, simple1_nwb_metadata):
     target_metadata["number_of_units"] = 0
     # We also populate with nd_types now, although here they would be empty
     target_metadata["nd_types"] = []
+    target_metadata["nd_type_modalities"] = {}
     # we do not populate any subject fields in our simple1_nwb
     for f in metadata_nwb_subject_fields:
         target_metadata[f] = None
@@ -215,6 +223,21 @@ def test_metadata2asset_simple1(schema_dir):
     _validate_asset_json(data_as_dict, schema_dir)
 
 
+def test_nwb2asset(simple2_nwb):
+    asset = nwb2asset(simple2_nwb, digest=32 * "d" + "-1", digest_type="dandi_etag")
+    assert isinstance(asset, BareAssetMeta)
+    assert asset.digest == {DigestType.dandi_etag: 32 * "d" + "-1"}
+    assert asset.path == str(simple2_nwb)
+    assert [p.identifier for p in asset.wasAttributedTo] == ["mouse001"]
+    assert asset.wasGeneratedBy[-1].name == "Metadata generation"
+    # Only the digest and the generation activity differ between calls
+    asset2 = nwb2asset(simple2_nwb, digest=32 * "e" + "-1", digest_type="dandi_etag")
+    assert asset2.digest == {DigestType.dandi_etag: 32 * "e" + "-1"}
+    assert asset2.wasGeneratedBy[-1].id != asset.wasGeneratedBy[-1].id
+    varying = {"digest", "dateModified", "wasGeneratedBy"}
+    assert asset2.dict(exclude=varying) == asset.dict(exclude=varying)
+
+
 def test_dandimeta_migration(schema_dir):
     with (METADATA_DIR / "dandimeta_migration.new.json").open() as fp:
         data_as_dict = json.load(fp)
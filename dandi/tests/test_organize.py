@@ -2,21 +2,34 @@ from glob import glob
 import os
 import os.path as op
 from pathlib import Path
+import shutil
 
+import pynwb
 import pytest
 import ruamel.yaml
 
+from .. import organize as organize_mod
 from ..cli.command import organize
 from ..consts import file_operation_modes
+from ..exceptions import OrganizeImpossibleError
 from ..organize import (
+    MetadataSummary,
+    OrganizeIndex,
+    OrganizeJournal,
+    OrganizePlan,
+    _assign_obj_id,
     _sanitize_value,
     create_dataset_yml_template,
     create_unique_filenames_from_metadata,
     detect_link_type,
+    execute_file_actions,
+    execute_plan,
     get_obj_id,
+    load_metadata,
+    plan_organize,
     populate_dataset_yml,
 )
-from ..pynwb_utils import copy_nwb_file, get_object_id
+from ..pynwb_utils import copy_nwb_file, get_object_id, make_nwb_file
 from ..utils import find_files, on_windows, yaml_load
 
 
@@ -91,6 +104,38 @@ def test_populate_dataset_yml(tmpdir):
     assert c()["number_of_cells"] == 2
 
 
+def test_populate_dataset_yml_summary(tmp_path):
+    metadata = [
+        {"age": 3, "cell_id": "1", "sex": "M", "related_publications": "'doi:1'"},
+        {"age": 1, "cell_id": "2", "sex": "F", "species": "mouse"},
+        {"age": 2, "cell_id": "2", "related_publications": ["doi:1", "doi:2 "]},
+        {"age": None, "slice_id": "s1", "experiment_description": "exp"},
+    ]
+    # summaries of subsets (e.g. from different workers) could be merged
+    summary = MetadataSummary(metadata[:2])
+    other = MetadataSummary()
+    for r in metadata[2:]:
+        other.add(r)
+    summary.merge(other)
+    assert summary.age_min == 1
+    assert summary.age_max == 3
+    path_list = tmp_path / "list.yaml"
+    path_summary = tmp_path / "summary.yaml"
+    for p in (path_list, path_summary):
+        p.write_text("id: test1\n")
+    populate_dataset_yml(str(path_list), metadata)
+    populate_dataset_yml(str(path_summary), summary)
+    assert path_list.read_text() == path_summary.read_text()
+    with open(path_summary) as f:
+        rec = yaml_load(f, typ="safe")
+    assert rec["age"] == {"minimum": 1, "maximum": 3, "units": "TODO"}
+    assert rec["number_of_cells"] == 2
+    assert rec["number_of_slices"] == 1
+    assert rec["organism"] == [{"species": "mouse"}]
+    assert rec["description"] == "exp"
+    assert rec["publications"] == ["doi:1", "doi:2"]
+
+
 # do not test 'move' - would need  a dedicated handling since it would
 # really move data away and break testing of other modes
 no_move_modes = file_operation_modes[:]
@@ -229,6 +274,31 @@ def test_ambiguous_probe1():
     ]
 
 
+def test_ambiguous_probe_many():
+    # Pairs of files which could be disambiguated only by their probes, mixed
+    # with files which are unique without them
+    n = 10000
+    metadata = []
+    for i in range(n):
+        rec = dict(path=f"{i}.nwb", subject_id=str(i // 2 % 100), nwb_version="2.2.5")
+        if i % 4 < 2:
+            rec.update(session_id=f"ses{i // 2}", probe_ids=[i % 2])
+        else:
+            rec.update(session_id=f"ses{i}")
+        metadata.append(rec)
+    metadata_ = create_unique_filenames_from_metadata(metadata)
+    dandi_paths = [m["dandi_path"] for m in metadata_]
+    assert len(set(dandi_paths)) == n
+    assert dandi_paths[:4] == [
+        op.join("sub-0", "sub-0_ses-ses0_probe-0.nwb"),
+        op.join("sub-0", "sub-0_ses-ses0_probe-1.nwb"),
+        op.join("sub-1", "sub-1_ses-ses2.nwb"),
+        op.join("sub-1", "sub-1_ses-ses3.nwb"),
+    ]
+    # original records are not modified
+    assert "dandi_path" not in metadata[0]
+
+
 @pytest.mark.parametrize(
     "sym_success,hard_success,result",
     [
@@ -248,3 +318,259 @@ def test_detect_link_type(monkeypatch, tmp_path, sym_success, hard_success, resu
     monkeypatch.setattr(os, "symlink", succeed_link if sym_success else error_link)
     monkeypatch.setattr(os, "link", succeed_link if hard_success else error_link)
     assert detect_link_type(tmp_path) == result
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_load_metadata(simple1_nwb, simple2_nwb, tmp_path, jobs):
+    badfile = tmp_path / "bad.nwb"
+    badfile.write_text("not an NWB file")
+    paths = [simple1_nwb, str(badfile), simple2_nwb]
+    results = load_metadata(paths, jobs=jobs)
+    assert [path for path, _, _ in results] == paths
+    (_, meta1, err1), (_, meta_bad, err_bad), (_, meta2, err2) = results
+    assert err1 is None and err2 is None
+    assert meta1["nwb_version"].startswith("2.")
+    assert meta2["subject_id"] == "mouse001"
+    assert meta_bad is None
+    assert isinstance(err_bad, str)
+
+
+def test_organize_incremental(simple2_nwb, tmp_path, clirunner, monkeypatch):
+    srcdir = tmp_path / "src"
+    srcdir.mkdir()
+    src1 = srcdir / "1.nwb"
+    shutil.copy(simple2_nwb, src1)
+    outdir = tmp_path / "organized"
+    args = ["--files-mode", "copy", "--incremental", "-d", str(outdir), str(srcdir)]
+    target = op.join("sub-mouse001", "sub-mouse001.nwb")
+
+    def get_produced_paths():
+        return [op.relpath(p, outdir) for p in find_files(r"\.nwb\Z", paths=outdir)]
+
+    def failing_copy(src, dst):
+        raise OSError("copy failed")
+
+    r = clirunner.invoke(organize, args)
+    assert r.exit_code == 0, r.output
+    assert get_produced_paths() == [target]
+    assert (outdir / OrganizeIndex.FILENAME).exists()
+    # Nothing new -- nothing to do, and no complaints about the existing target
+    r = clirunner.invoke(organize, args)
+    assert r.exit_code == 0, r.output
+    assert get_produced_paths() == [target]
+
+    # A new file with the same metadata conflicts with the organized one, and we
+    # fail before doing anything
+    copy_nwb_file(simple2_nwb, str(srcdir / "2.nwb"))
+    r = clirunner.invoke(organize, args)
+    assert r.exit_code != 0
+    assert "organized before" in r.output
+    assert get_produced_paths() == [target]
+    os.unlink(srcdir / "2.nwb")
+
+    # A changed file gets organized anew, replacing its previous copy
+    (outdir / target).write_bytes(b"outdated")
+    st = src1.stat()
+    os.utime(src1, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    # which is restored if the run fails and gets rolled back
+    with monkeypatch.context() as m:
+        m.setitem(organize_mod._file_actions, "copy", failing_copy)
+        r = clirunner.invoke(organize, args)
+    assert r.exit_code != 0
+    assert not (outdir / target).exists()
+    r = clirunner.invoke(organize, ["--rollback", "-d", str(outdir)])
+    assert r.exit_code == 0, r.output
+    assert (outdir / target).read_bytes() == b"outdated"
+    assert not (outdir / ".dandi" / "organize-replaced").exists()
+    r = clirunner.invoke(organize, args)
+    assert r.exit_code == 0, r.output
+    assert get_produced_paths() == [target]
+    assert (outdir / target).read_bytes() == src1.read_bytes()
+    assert not (outdir / ".dandi" / "organize-replaced").exists()
+
+
+def test_organize_incremental_sessions(simple1_nwb_metadata, tmp_path, clirunner):
+    # Names of the files of a new session are chosen considering the sessions
+    # organized before, so they do not conflict with the names of those
+    srcdir = tmp_path / "src"
+    srcdir.mkdir()
+    outdir = tmp_path / "organized"
+    args = ["--files-mode", "copy", "--incremental", "-d", str(outdir), str(srcdir)]
+    for session_id in ["ses1", "ses2", "ses3"]:
+        make_nwb_file(
+            str(srcdir / f"{session_id}.nwb"),
+            subject=pynwb.file.Subject(subject_id="mouse001", species="mouse"),
+            **dict(simple1_nwb_metadata, session_id=session_id),
+        )
+        r = clirunner.invoke(organize, args)
+        assert r.exit_code == 0, r.output
+    assert sorted(
+        op.relpath(p, outdir) for p in find_files(r"\.nwb\Z", paths=outdir)
+    ) == [
+        op.join("sub-mouse001", "sub-mouse001.nwb"),
+        op.join("sub-mouse001", "sub-mouse001_ses-ses2.nwb"),
+        op.join("sub-mouse001", "sub-mouse001_ses-ses3.nwb"),
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_execute_file_actions(tmp_path, jobs):
+    src = tmp_path / "src"
+    src.mkdir()
+    actions = []
+    for i in range(10):
+        (src / f"{i}.nwb").write_text(str(i))
+        mode = ["copy", "move"][i % 2]
+        actions.append(
+            (mode, str(src / f"{i}.nwb"), str(tmp_path / f"sub-{i}/{i}.nwb"))
+        )
+    assert execute_file_actions(actions, jobs=jobs) == 10
+    for i in range(10):
+        assert (tmp_path / f"sub-{i}/{i}.nwb").read_text() == str(i)
+        assert (src / f"{i}.nwb").exists() == (i % 2 == 0)
+
+
+def test_execute_file_actions_journal(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    actions = []
+    for i in range(4):
+        (src / f"{i}.nwb").write_text(str(i))
+        actions.append(("move", str(src / f"{i}.nwb"), str(tmp_path / f"{i}.nwb")))
+    # the last one fails
+    actions.append(("move", str(src / "missing.nwb"), str(tmp_path / "missing.nwb")))
+    journal = OrganizeJournal(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        execute_file_actions(actions, jobs=1, journal=journal)
+    journal.close(False)
+    assert journal.filepath.exists()
+
+    # resuming skips completed actions
+    journal = OrganizeJournal(tmp_path)
+    assert len(journal) == 4
+    assert journal.is_done(*actions[0])
+    # but not if the target was produced otherwise, e.g. from another file
+    assert not journal.is_done("move", str(src / "other.nwb"), actions[0][2])
+    assert not journal.is_done("copy", *actions[0][1:])
+    (src / "missing.nwb").write_text("missing")
+    assert execute_file_actions(actions, journal=journal) == 1
+    journal.close(False)
+
+    # and all of them can be undone
+    journal = OrganizeJournal(tmp_path)
+    assert len(journal) == 5
+    journal.rollback()
+    assert not journal.filepath.exists()
+    assert sorted(p.name for p in src.iterdir()) == [
+        "0.nwb",
+        "1.nwb",
+        "2.nwb",
+        "3.nwb",
+        "missing.nwb",
+    ]
+    assert not list(tmp_path.glob("*.nwb"))
+
+
+def test_assign_obj_id(monkeypatch):
+    object_ids = {
+        "a.nwb": "79c83b2c-f3d5-4a22-be45-4ab2ae1ce21f",
+        "b.nwb": "0c4ebbd2-d1ef-41bf-9a17-c4ae9b4d8a74",
+        "c.nwb": "79c83b2c-f3d5-4a22-be45-4ab2ae1ce21f",
+        "d.nwb": None,
+    }
+    inspected = []
+
+    def inspect_nwb(path):
+        inspected.append(path)
+        return {"object_id": object_ids[path]}
+
+    monkeypatch.setattr(organize_mod, "inspect_nwb", inspect_nwb)
+    metadata = [
+        {"path": p, "dandi_path": "sub-1/sub-1.nwb" if p != "b.nwb" else "other.nwb"}
+        for p in ["a.nwb", "b.nwb"]
+    ]
+    metadata.append({"path": "e.nwb", "dandi_path": "sub-2/sub-2.nwb"})
+    non_unique = {"sub-1/sub-1.nwb": ["a.nwb"], "other.nwb": ["b.nwb"]}
+    _assign_obj_id(metadata, non_unique)
+    # only files with non-unique paths are considered
+    assert inspected == ["a.nwb", "b.nwb"]
+    assert metadata[0]["obj_id"] == get_obj_id(object_ids["a.nwb"])
+    assert metadata[1]["obj_id"] == get_obj_id(object_ids["b.nwb"])
+    assert "obj_id" not in metadata[2]
+
+    metadata = [{"path": p, "dandi_path": "sub-1/sub-1.nwb"} for p in object_ids]
+    with pytest.raises(OrganizeImpossibleError, match="have the same object_id"):
+        _assign_obj_id(metadata, {"sub-1/sub-1.nwb": list(object_ids)})
+    with pytest.raises(OrganizeImpossibleError, match="object_id but it is absent"):
+        _assign_obj_id(metadata[3:], {"sub-1/sub-1.nwb": ["d.nwb"]})
+
+
+def test_plan_organize(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    dandiset_path = tmp_path / "dandiset"
+    (dandiset_path / "sub-3").mkdir(parents=True)
+    metadata = []
+    for i in range(1, 3):
+        (src / f"{i}.nwb").write_text(str(i))
+        metadata.append(
+            {"path": str(src / f"{i}.nwb"), "dandi_path": f"sub-{i}/sub-{i}.nwb"}
+        )
+    # already in place
+    (dandiset_path / "sub-3" / "sub-3.nwb").write_text("3")
+    metadata.append(
+        {
+            "path": str(dandiset_path / "sub-3" / "sub-3.nwb"),
+            "dandi_path": "sub-3/sub-3.nwb",
+        }
+    )
+    plan = plan_organize(metadata, str(dandiset_path), "copy")
+    assert [(i["action"], i["reason"]) for i in plan] == [
+        ("copy", "organize"),
+        ("copy", "organize"),
+        ("skip", "same path"),
+    ]
+    assert [i["target"] for i in plan] == [
+        str(dandiset_path / m["dandi_path"]) for m in metadata
+    ]
+    # nothing was done yet
+    assert not (dandiset_path / "sub-1").exists()
+
+    # plans could be saved, and executed later
+    plan.save(tmp_path / "plan.json")
+    plan = OrganizePlan.load(tmp_path / "plan.json")
+    assert len(plan) == 3
+    acted_upon = execute_plan(plan, jobs=2)
+    assert [i["dandi_path"] for i in acted_upon] == [
+        "sub-1/sub-1.nwb",
+        "sub-2/sub-2.nwb",
+    ]
+    assert (dandiset_path / "sub-1" / "sub-1.nwb").read_text() == "1"
+    assert (dandiset_path / "sub-2" / "sub-2.nwb").read_text() == "2"
+
+    # existing different targets are refused
+    with pytest.raises(AssertionError, match="2 paths already exist"):
+        plan_organize(metadata, str(dandiset_path), "copy")
+
+
+def test_organize_save_execute_plan(simple2_nwb, tmp_path, clirunner):
+    outdir = tmp_path / "organized"
+    planfile = tmp_path / "plan.json"
+    args = ["--files-mode", "copy", "-d", str(outdir), simple2_nwb]
+    r = clirunner.invoke(organize, args + ["--save-plan", str(planfile)])
+    assert r.exit_code == 0, r.output
+    assert not list(find_files(".*", paths=str(outdir)))
+    plan = OrganizePlan.load(planfile)
+    assert [(i["action"], i["dandi_path"]) for i in plan] == [
+        ("copy", op.join("sub-mouse001", "sub-mouse001.nwb"))
+    ]
+    # the plan defines everything
+    r = clirunner.invoke(organize, ["--execute-plan", str(planfile), simple2_nwb])
+    assert r.exit_code != 0
+    assert "cannot be used with PATHS" in r.output
+    r = clirunner.invoke(organize, ["--execute-plan", str(planfile), "--rollback"])
+    assert r.exit_code != 0
+    assert "cannot be used with --rollback" in r.output
+    r = clirunner.invoke(organize, ["--execute-plan", str(planfile)])
+    assert r.exit_code == 0, r.output
+    assert (outdir / "sub-mouse001" / "sub-mouse001.nwb").exists()
@@ -1,8 +1,27 @@
+import json
+import os
 import re
+from subprocess import check_output
+import sys
 
+import h5py
 import pynwb
+import pytest
 
-from ..pynwb_utils import _sanitize_nwb_version
+from .. import pynwb_utils
+from ..pynwb_utils import (
+    _count_neurodata_types,
+    _get_h5py_metadata,
+    _get_pynwb_metadata,
+    _sanitize_nwb_version,
+    get_metadata_extractor,
+    get_neurodata_type_modality,
+    get_neurodata_types,
+    get_neurodata_types_to_modalities_map,
+    get_nwb_version,
+    get_object_id,
+    inspect_nwb,
+)
 
 
 def test_pynwb_io(simple1_nwb):
@@ -44,3 +63,124 @@ def test_sanitize_nwb_version():
         )
         == "2.1.0"
     )
+
+
+@pytest.mark.parametrize("nwb_fixture", ["simple1_nwb", "simple2_nwb"])
+def test_get_h5py_metadata(nwb_fixture, request):
+    path = request.getfixturevalue(nwb_fixture)
+    assert _get_h5py_metadata(path) == _get_pynwb_metadata(path)
+
+
+def test_get_h5py_metadata_not_nwb2(tmp_path):
+    path = tmp_path / "old.nwb"
+    with h5py.File(path, "w") as f:
+        f.attrs["nwb_version"] = "1.0.6"
+    assert _get_h5py_metadata(path) is None
+
+
+def test_get_metadata_extractor(monkeypatch):
+    monkeypatch.setattr(pynwb_utils, "metadata_nwb_extractor", "h5py")
+    assert get_metadata_extractor() == "h5py"
+    monkeypatch.setattr(pynwb_utils, "metadata_nwb_extractor", "pynwb")
+    assert get_metadata_extractor() == "pynwb"
+    monkeypatch.setattr(pynwb_utils, "metadata_nwb_extractor", "bogus")
+    with pytest.raises(ValueError):
+        get_metadata_extractor()
+
+
+@pytest.mark.parametrize("extractor", ["h5py", "pynwb"])
+def test_metadata_extractor_cache_tokens(extractor):
+    # results memoized with one extractor must not be reused with the other
+    out = check_output(
+        [
+            sys.executable,
+            "-c",
+            "from dandi.pynwb_utils import dandi_cache_tokens as t; print(t)",
+        ],
+        env=dict(os.environ, DANDI_METADATA_EXTRACTOR=extractor),
+        universal_newlines=True,
+    )
+    assert repr(extractor) in out
+
+
+def test_inspect_nwb(simple2_nwb):
+    inspection = inspect_nwb(simple2_nwb)
+    assert inspection == {
+        "nwb_version": get_nwb_version(simple2_nwb),
+        "metadata": _get_h5py_metadata(simple2_nwb),
+        "nd_types": get_neurodata_types(simple2_nwb),
+        "nd_type_modalities": {"Subject": "file"},
+        "object_id": get_object_id(simple2_nwb),
+    }
+    assert inspection["nd_types"] == ["Subject"]
+
+
+def test_count_neurodata_types(tmp_path):
+    path = tmp_path / "many.h5"
+    with h5py.File(path, "w") as f:
+        f.attrs["neurodata_type"] = "NWBFile"
+        for i in range(20):
+            g = f.create_group(f"series{i}")
+            g.attrs["neurodata_type"] = "TimeSeries"
+            for j in range(50):
+                sweep = g.create_group(f"sweep{j}")
+                sweep.attrs["neurodata_type"] = "PatchClampSeries"
+                # datasets are not considered
+                sweep.create_dataset("data", data=[1, 2])
+                sweep["data"].attrs["neurodata_type"] = "VectorData"
+                sweep.create_group("untyped")
+        # objects reachable via multiple links are counted once
+        f["series0/alias"] = h5py.SoftLink("/series1")
+        f["series0/hardlink"] = f["series1"]
+    with h5py.File(path, "r") as f:
+        assert _count_neurodata_types(f) == {
+            "NWBFile": 1,
+            "TimeSeries": 20,
+            "PatchClampSeries": 1000,
+        }
+    assert get_neurodata_types(path) == ["PatchClampSeries (1000)", "TimeSeries (20)"]
+
+
+def test_get_neurodata_types_to_modalities_map():
+    ndtypes = get_neurodata_types_to_modalities_map()
+    assert ndtypes["ElectricalSeries"] == "ecephys"
+    assert ndtypes["PatchClampSeries"] == "icephys"
+    # changes to the returned map do not affect the ones returned later
+    ndtypes["ElectricalSeries"] = "bogus"
+    assert get_neurodata_types_to_modalities_map()["ElectricalSeries"] == "ecephys"
+    assert get_neurodata_type_modality("ElectricalSeries") == "ecephys"
+
+
+def test_get_neurodata_type_modality(monkeypatch, tmp_path):
+    # extensions loaded into the process do not matter
+    monkeypatch.setattr(pynwb, "available_namespaces", lambda: ("core", "ndx-test"))
+    assert get_neurodata_type_modality("ElectricalSeries") == "ecephys"
+    assert get_neurodata_type_modality("MySeries") is None
+    # but the specifications cached within a file do
+    spec = {
+        "groups": [
+            {
+                "neurodata_type_def": "MySeries",
+                "neurodata_type_inc": "MyBaseSeries",
+            },
+            {
+                "neurodata_type_def": "MyBaseSeries",
+                "neurodata_type_inc": "ElectricalSeries",
+                "groups": [{"neurodata_type_def": "MyLoop"}],
+            },
+            {"neurodata_type_def": "MyCycle", "neurodata_type_inc": "MyCycle"},
+        ]
+    }
+    path = tmp_path / "ext.nwb"
+    with h5py.File(path, "w") as f:
+        f.attrs["neurodata_type"] = "NWBFile"
+        f["specifications/ndx-test/0.1.0/ndx-test.extensions"] = json.dumps(spec)
+        for ndtype in "MySeries", "MyLoop", "MyCycle", "Subject":
+            f.create_group(ndtype).attrs["neurodata_type"] = ndtype
+    assert inspect_nwb(path)["nd_type_modalities"] == {
+        "MyCycle": None,
+        "MyLoop": None,
+        "MySeries": "ecephys",
+        "Subject": "file",
+    }
+    assert "MySeries" not in get_neurodata_types_to_modalities_map()
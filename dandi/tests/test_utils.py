@@ -12,8 +12,10 @@ from .. import __version__
 from ..consts import dandi_instance, known_instances
 from ..exceptions import BadCliVersionError, CliVersionTooOldError
 from ..utils import (
+    copy_file,
     ensure_datetime,
     ensure_strtime,
+    find_file_entries,
     find_files,
     flatten,
     flattened,
@@ -85,6 +87,34 @@ def test_find_files_dotfiles(tmpdir):
     assert relpaths(ff) == sorted(regular + dotfiles + vcs)
 
 
+@pytest.mark.parametrize("jobs", [None, 4])
+def test_find_file_entries(tmp_path, jobs):
+    for d in ["a/b/c", "a/d", "e", ".f"]:
+        (tmp_path / d).mkdir(parents=True)
+        for name in ["1.nwb", "2.txt", ".3.nwb"]:
+            (tmp_path / d / name).write_text(d)
+    entries = list(find_file_entries(r"\.nwb\Z", tmp_path, jobs=jobs))
+    # the same as (and in the same order as) with os.walk
+    expected = []
+    for dirpath, dirnames, filenames in os.walk(tmp_path):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        expected.extend(
+            op.join(dirpath, f)
+            for f in filenames
+            if f.endswith(".nwb") and not f.startswith(".")
+        )
+    assert [e.path for e in entries] == expected
+    assert len(expected) == 3
+    for e in entries:
+        assert op.samestat(e.stat(), os.stat(e))
+        assert e.stat() is e.stat()
+    # paths given explicitly are yielded as they are, but as str
+    path = tmp_path / "e" / "1.nwb"
+    (entry,) = find_file_entries(r"\.nwb\Z", [path], jobs=jobs)
+    assert entry.path == str(path)
+    assert os.fspath(entry) == str(path)
+
+
 def test_times_manipulations():
     t0 = get_utcnow_datetime()
     t0_isoformat = ensure_strtime(t0)
@@ -351,3 +381,14 @@ def test_get_module_version():
     assert get_module_version("dandi") == __version__
     assert get_module_version("pynwb") == pynwb.__version__
     assert get_module_version("abracadabra123") is None
+
+
+def test_copy_file(tmp_path):
+    src = tmp_path / "src.dat"
+    src.write_bytes(os.urandom(300000))
+    os.utime(src, (1000000000, 1000000000))
+    dst = tmp_path / "dst.dat"
+    copy_file(src, dst)
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_mtime == 1000000000
+    assert not op.samefile(src, dst)
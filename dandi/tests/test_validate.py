@@ -1,6 +1,11 @@
+from pathlib import Path
+
 from dandischema.models import get_schema_version
 
-from ..validate import validate_file
+from .. import validate as validate_mod
+from ..consts import dandiset_metadata_file
+from ..dandiset import DandisetState
+from ..validate import ValidationIndex, validate, validate_file
 
 
 def test_validate_simple1(simple1_nwb):
@@ -31,3 +36,58 @@ def test_validate_bogus(tmp_path):
     # ATM we would get 2 errors -- since could not be open in two places,
     # but that would be too rigid to test. Let's just see that we have expected errors
     assert any(e.startswith("Failed to read metadata") for e in errors)
+
+
+def test_validate_parallel(tmp_path):
+    (tmp_path / dandiset_metadata_file).write_text("identifier: 000001\n")
+    for i in range(5):
+        (tmp_path / f"wannabe{i}.nwb").write_text("not really nwb")
+    serial = list(validate(str(tmp_path)))
+    parallel = list(validate(str(tmp_path), jobs=2))
+    assert parallel == serial
+    assert len(parallel) == 6
+    # paths given as Path
+    path = str(tmp_path / "wannabe0.nwb")
+    assert list(validate([Path(path)])) == [(path, dict(serial)[path])]
+
+
+def test_validate_changed_only(tmp_path):
+    dandiset_yaml = tmp_path / dandiset_metadata_file
+    dandiset_yaml.write_text("identifier: '000001'\nname: Test\ndescription: Test\n")
+    (tmp_path / "wannabe.nwb").write_text("not really nwb")
+    results = dict(validate(str(tmp_path)))
+    assert not results[str(dandiset_yaml)]
+    assert results[str(tmp_path / "wannabe.nwb")]
+    assert DandisetState(tmp_path).filepath.exists()
+    # nothing is written into the dandiset
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        dandiset_metadata_file,
+        "wannabe.nwb",
+    ]
+    # Only invalid files get validated again
+    assert [p for p, _ in validate(str(tmp_path), changed_only=True)] == [
+        str(tmp_path / "wannabe.nwb")
+    ]
+    index = ValidationIndex.for_path(tmp_path)
+    assert index.get_errors(dandiset_yaml) == []
+    assert index.get_errors(dandiset_yaml, schema_version="0.0.0") is None
+    dandiset_yaml.write_text("identifier: '000001'\n")
+    assert index.get_errors(dandiset_yaml) is None
+    results = dict(validate(str(tmp_path), changed_only=True))
+    assert results[str(dandiset_yaml)]
+
+
+def test_validate_loads_state_once(monkeypatch, tmp_path):
+    (tmp_path / dandiset_metadata_file).write_text("identifier: 000001\n")
+    for i in range(3):
+        (tmp_path / f"sub-{i}").mkdir()
+        (tmp_path / f"sub-{i}" / "wannabe.nwb").write_text("not really nwb")
+    states = []
+
+    def make_state(path):
+        states.append(path)
+        return DandisetState(path)
+
+    monkeypatch.setattr(validate_mod, "DandisetState", make_state)
+    assert len(list(validate(str(tmp_path)))) == 4
+    assert states == [tmp_path]
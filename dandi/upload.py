@@ -26,7 +26,7 @@ def upload(
     sync=False,
 ):
     from .dandiapi import DandiAPIClient
-    from .dandiset import APIDandiset, Dandiset
+    from .dandiset import APIDandiset, Dandiset, DandisetState
     from .support.digests import get_digest
 
     dandiset = Dandiset.find(dandiset_path)
@@ -57,10 +57,12 @@ def upload(
     from .metadata import get_default_metadata, nwb2asset
     from .pynwb_utils import ignore_benign_pynwb_warnings
     from .support.pyout import naturalsize
-    from .utils import find_dandi_files, find_files, path_is_subpath
-    from .validate import validate_file
+    from .utils import find_dandi_file_entries, find_file_entries, path_is_subpath
+    from .validate import ValidationIndex, validate_file
 
     ignore_benign_pynwb_warnings()  # so validate doesn't whine
+    state = DandisetState(dandiset.path)
+    validation_index = ValidationIndex(state)
 
     #
     # Treat paths
@@ -70,8 +72,13 @@ def upload(
     original_paths = paths
 
     # Expand and validate all paths -- they should reside within dandiset
-    paths = find_files(".*", paths) if allow_any_path else find_dandi_files(paths)
-    paths = list(map(Path, paths))
+    if allow_any_path:
+        entries = find_file_entries(".*", paths, jobs=jobs)
+    else:
+        entries = find_dandi_file_entries(paths, jobs=jobs)
+    # so we do not stat the files again
+    entries = {Path(e.path): e for e in entries}
+    paths = list(entries)
     npaths = len(paths)
     lgr.info(f"Found {npaths} files to consider")
     for path in paths:
@@ -120,7 +127,7 @@ def upload(
         relpath = PurePosixPath(relpath)
         try:
             try:
-                path_stat = path.stat()
+                path_stat = entries[path].stat()
                 yield {"size": path_stat.st_size}
             except FileNotFoundError:
                 yield skip_file("ERROR: File not found")
@@ -136,7 +143,11 @@ def upload(
             # TODO: enable back validation of dandiset.yaml
             if path.name != dandiset_metadata_file and validation != "skip":
                 yield {"status": "pre-validating"}
-                validation_errors = validate_file(path)
+                # No need to validate again if we know results for this file
+                validation_errors = validation_index.get_errors(entries[path])
+                if validation_errors is None:
+                    validation_errors = validate_file(path)
+                    validation_index.record(entries[path], validation_errors)
                 yield {"errors": len(validation_errors)}
                 # TODO: split for dandi, pynwb errors
                 if validation_errors:
@@ -171,11 +182,15 @@ def upload(
             # Compute checksums
             #
             yield {"status": "digesting"}
-            try:
-                file_etag = get_digest(path, digest="dandi-etag")
-            except Exception as exc:
-                yield skip_file("failed to compute digest: %s" % str(exc))
-                return
+            # No need to digest again if the file did not change since
+            file_etag = state.get_etag(entries[path])
+            if file_etag is None:
+                try:
+                    file_etag = get_digest(path, digest="dandi-etag")
+                except Exception as exc:
+                    yield skip_file("failed to compute digest: %s" % str(exc))
+                    return
+                state.update(entries[path], etag=file_etag)
 
             try:
                 extant = remote_dandiset.get_asset_by_path(str(relpath))
@@ -191,6 +206,8 @@ def upload(
                 else:
                     # TODO: Should this error instead?
                     extant_etag = None
+                if extant_etag == file_etag:
+                    state.update(entries[path], asset_id=extant.identifier)
                 if remote_mtime_str is not None:
                     remote_mtime = ensure_datetime(remote_mtime_str)
                     remote_file_status = (
@@ -266,7 +283,9 @@ def upload(
             for r in remote_dandiset.iter_upload_raw_asset(
                 path, metadata, jobs=jobs_per_file
             ):
-                r.pop("asset", None)  # to keep pyout from choking
+                asset = r.pop("asset", None)  # to keep pyout from choking
+                if asset is not None:
+                    state.update(entries[path], asset_id=asset.identifier)
                 if r["status"] == "uploading":
                     uploaded_paths[str(path)]["size"] = r.pop("current")
                     yield r
@@ -342,6 +361,7 @@ def upload(
                 else:
                     rec.update(skip_file(exc))
             out(rec)
+    state.save()
 
     if sync:
         relpaths = []
@@ -361,3 +381,5 @@ def upload(
         ):
             for asset in to_delete:
                 asset.delete()
+                state.remove(Path(dandiset.path, asset.path))
+            state.save()
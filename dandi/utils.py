@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 
 try:
@@ -9,6 +10,7 @@ except ImportError:
 import inspect
 import io
 import itertools
+import json
 import logging
 import os
 import os.path as op
@@ -16,8 +18,8 @@ from pathlib import Path
 import platform
 import re
 import shutil
-import subprocess
 import sys
+from threading import Lock
 import types
 from typing import Optional, Union
 
@@ -266,6 +268,229 @@ _VCS_REGEX = r"%s\.(?:git|gitattributes|svn|bzr|hg)(?:%s|$)" % (
 _DATALAD_REGEX = r"%s\.(?:datalad)(?:%s|$)" % (_encoded_dirsep, _encoded_dirsep)
 
 
+class FileEntry:
+    """A path found by `find_file_entries`, with its stat information
+
+    The stat information is obtained at most once, and for paths found while
+    traversing directories it is provided by `os.scandir` whenever possible.
+    Can be used wherever a path is expected, via `os.fspath`.
+    """
+
+    __slots__ = ("path", "_direntry", "_stat")
+
+    def __init__(self, path, direntry=None):
+        # __fspath__ must return str (or bytes), so no Path is stored
+        self.path = os.fspath(path)
+        # On Windows st_ino etc. of DirEntry.stat() are 0, so we stat on our own
+        self._direntry = direntry if not on_windows else None
+        self._stat = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    def __fspath__(self):
+        return self.path
+
+    def stat(self):
+        """Return (cached) result of `os.stat` for the path"""
+        if self._stat is None:
+            if self._direntry is not None:
+                self._stat = self._direntry.stat()
+            else:
+                self._stat = os.stat(self.path)
+        return self._stat
+
+
+class PersistentFileIndex:
+    """Records about files, persisted as JSON
+
+    A record remains valid only as long as the identity (size, modification
+    time and inode) of its file, which is stored within the record, does not
+    change.  Subclasses define what the records are keyed by and what else they
+    contain.
+    """
+
+    _IDENTITY_FIELDS = ("size", "mtime_ns", "ino")
+    # What the index is, for log messages
+    _DESCRIPTION = "file index"
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self._records = {}
+        self._modified = False
+        self._lock = Lock()
+        self._load()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _load(self):
+        try:
+            with open(self.filepath) as f:
+                self._records = self._load_records(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            lgr.warning(
+                "Ignoring unreadable %s %s: %s", self._DESCRIPTION, self.filepath, exc
+            )
+
+    def _load_records(self, data):
+        """Return the records from the loaded JSON ``data``"""
+        return data["files"]
+
+    def _dump_records(self):
+        """Return the JSON data to save"""
+        return {"files": self._records}
+
+    @staticmethod
+    def get_identity(filepath):
+        """Return the identity of a file (path or `FileEntry`) in its current
+        state"""
+        s = filepath.stat() if isinstance(filepath, FileEntry) else os.stat(filepath)
+        return {"size": s.st_size, "mtime_ns": s.st_mtime_ns, "ino": s.st_ino}
+
+    def _is_same(self, rec, identity):
+        return all(rec[f] == identity[f] for f in self._IDENTITY_FIELDS)
+
+    def _get_current(self, key, filepath):
+        """Return the record under ``key`` if it is for the current state of
+        the file, or None"""
+        rec = self._records.get(key)
+        if rec is None:
+            return None
+        try:
+            identity = self.get_identity(filepath)
+        except FileNotFoundError:
+            return None
+        return rec if self._is_same(rec, identity) else None
+
+    def save(self):
+        """Save the records (atomically) if they were modified"""
+        with self._lock:
+            if not self._modified:
+                return
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            tmppath = self.filepath.with_name(f"{self.filepath.name}.{os.getpid()}.tmp")
+            with open(tmppath, "w") as f:
+                json.dump(self._dump_records(), f)
+            os.replace(tmppath, self.filepath)
+            self._modified = False
+
+
+def find_file_entries(
+    regex,
+    paths=os.curdir,
+    exclude=None,
+    exclude_dotfiles=True,
+    exclude_dotdirs=True,
+    exclude_vcs=True,
+    exclude_datalad=False,
+    dirs=False,
+    jobs=None,
+):
+    """Generator to find files matching regex, yielding `FileEntry`'s
+
+    See `find_files` for the description of the parameters.
+
+    Parameters
+    ----------
+    jobs: int, optional
+      Number of threads to list directories in parallel, which is beneficial
+      on network and parallel file systems.  Paths are yielded in the same
+      order regardless.
+    """
+    regex = re.compile(regex)
+    excludes = [
+        re.compile(r)
+        for r, enabled in [
+            (exclude, exclude),
+            (_VCS_REGEX, exclude_vcs),
+            (_DATALAD_REGEX, exclude_datalad),
+        ]
+        if enabled
+    ]
+
+    def good_file(path):
+        if not regex.search(path):
+            return False
+        path = path.rstrip(op.sep)
+        return not any(r.search(path) for r in excludes)
+
+    def scan(dirpath):
+        """Return subdirectories to descend into and entries found in dirpath"""
+        dir_entries = []
+        file_entries = []
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    (dir_entries if is_dir else file_entries).append(entry)
+        except OSError as exc:
+            # as os.walk does, ignore directories which cannot be listed
+            lgr.debug("Cannot list %s: %s", dirpath, exc)
+        subdirs = [
+            entry.path
+            for entry in dir_entries
+            if not (exclude_dotdirs and entry.name.startswith("."))
+            and not entry.is_symlink()
+        ]
+        found = []
+        for entry in (dir_entries + file_entries) if dirs else file_entries:
+            if exclude_dotfiles and entry.name.startswith("."):
+                continue
+            if not good_file(entry.path):
+                continue
+            if entry.is_symlink() and entry.is_dir():
+                lgr.warning(
+                    "%s: Ignoring unsupported symbolic link to directory", entry.path
+                )
+            else:
+                found.append(FileEntry(entry.path, entry))
+        return subdirs, found
+
+    def walk(top):
+        # Depth-first, visiting subdirectories in the order of listing, as
+        # os.walk(topdown=True) does
+        if jobs is None or jobs == 1:
+            stack = [top]
+            while stack:
+                subdirs, found = scan(stack.pop())
+                yield from found
+                stack.extend(reversed(subdirs))
+            return
+        # Listings of all known directories are requested as soon as they are
+        # known, while we consume them in the same depth-first order
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            stack = [executor.submit(scan, top)]
+            try:
+                while stack:
+                    subdirs, found = stack.pop().result()
+                    yield from found
+                    stack.extend(executor.submit(scan, d) for d in reversed(subdirs))
+            finally:
+                for fut in stack:
+                    fut.cancel()
+
+    if isinstance(paths, (list, tuple, set)):
+        for path in paths:
+            if op.isdir(path):
+                yield from walk(path)
+            elif good_file(str(path)):
+                yield FileEntry(path)
+            else:
+                # Provided path didn't match regex, thus excluded
+                pass
+    elif op.isfile(paths):
+        if good_file(str(paths)):
+            yield FileEntry(paths)
+    else:
+        yield from walk(paths)
+
+
 def find_files(
     regex,
     paths=os.curdir,
@@ -275,6 +500,7 @@ def find_files(
     exclude_vcs=True,
     exclude_datalad=False,
     dirs=False,
+    jobs=None,
 ):
     """Generator to find files matching regex
 
@@ -296,90 +522,78 @@ def find_files(
       .datalad/ subdirectory) (regex: `%r`)
     dirs: bool, optional
       Whether to match directories as well as files
+    jobs: int, optional
+      Number of threads to list directories in parallel
     """
+    for entry in find_file_entries(
+        regex,
+        paths=paths,
+        exclude=exclude,
+        exclude_dotfiles=exclude_dotfiles,
+        exclude_dotdirs=exclude_dotdirs,
+        exclude_vcs=exclude_vcs,
+        exclude_datalad=exclude_datalad,
+        dirs=dirs,
+        jobs=jobs,
+    ):
+        yield entry.path
 
-    def exclude_path(path):
-        path = path.rstrip(op.sep)
-        if exclude and re.search(exclude, path):
-            return True
-        if exclude_vcs and re.search(_VCS_REGEX, path):
-            return True
-        if exclude_datalad and re.search(_DATALAD_REGEX, path):
-            return True
-        return False
-
-    def good_file(path):
-        return re.search(regex, path) and not exclude_path(path)
 
-    if isinstance(paths, (list, tuple, set)):
-        for path in paths:
-            if op.isdir(path):
-                yield from find_files(
-                    regex,
-                    paths=path,
-                    exclude=exclude,
-                    exclude_dotfiles=exclude_dotfiles,
-                    exclude_dotdirs=exclude_dotdirs,
-                    exclude_vcs=exclude_vcs,
-                    exclude_datalad=exclude_datalad,
-                    dirs=dirs,
-                )
-            elif good_file(path):
-                yield path
-            else:
-                # Provided path didn't match regex, thus excluded
-                pass
-        return
-    elif op.isfile(paths):
-        if good_file(paths):
-            yield paths
-        return
-
-    for dirpath, dirnames, filenames in os.walk(paths):
-        names = (dirnames + filenames) if dirs else filenames
-        # TODO: might want to uniformize on windows to use '/'
-        if exclude_dotfiles:
-            names = (n for n in names if not n.startswith("."))
-        if exclude_dotdirs:
-            # and we should filter out directories from dirnames
-            # Since we need to del which would change index, let's
-            # start from the end
-            for i in range(len(dirnames))[::-1]:
-                if dirnames[i].startswith("."):
-                    del dirnames[i]
-        paths = (op.join(dirpath, name) for name in names)
-        for path in filter(re.compile(regex).search, paths):
-            if not exclude_path(path):
-                if op.islink(path) and op.isdir(path):
-                    lgr.warning(
-                        "%s: Ignoring unsupported symbolic link to directory", path
-                    )
-                else:
-                    yield path
-
-
-_cp_supports_reflink = None
+# ioctl request to clone (reflink) a file on Linux
+FICLONE = 0x40049409
 
 
 def copy_file(src, dst):
-    """Copy file from src to dst"""
-    global _cp_supports_reflink
-    if _cp_supports_reflink is None:
-        r = subprocess.run(
-            ["cp", "--help"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-        )
-        # Ignore command failures (e.g., if cp doesn't support --help), as the
-        # command will still likely output its usage info.
-        _cp_supports_reflink = "--reflink" in r.stdout
-    if _cp_supports_reflink:
-        subprocess.run(
-            ["cp", "-f", "--reflink=auto", "--", str(src), str(dst)], check=True
-        )
-    else:
+    """Copy file from src to dst
+
+    A copy-on-write clone (reflink) of the file is attempted first, and then
+    an in-kernel copy with ``copy_file_range``, before falling back to a
+    regular copy.  File permissions and times are copied as well.
+    """
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            copied = _clone_file(fsrc, fdst) or _copy_file_range(fsrc, fdst)
+    except OSError as exc:
+        lgr.debug("Failed to copy %s efficiently: %s", src, exc)
+        copied = False
+    if not copied:
         return shutil.copy2(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
+
+def _clone_file(fsrc, fdst):
+    """Clone the content of the file, returning False if not supported"""
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        # e.g. not supported by the file system or across file systems
+        return False
+    return True
+
+
+def _copy_file_range(fsrc, fdst):
+    """Copy the content of the file within the kernel, returning False if not
+    supported"""
+    if not hasattr(os, "copy_file_range"):  # Python < 3.8 or not Linux
+        return False
+    size = os.fstat(fsrc.fileno()).st_size
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError:
+        # e.g. not supported by older kernels across file systems.  Whatever
+        # was copied would be overwritten by a regular copy
+        return False
+    return True
 
 
 def move_file(src, dst):
@@ -387,10 +601,17 @@ def move_file(src, dst):
     return shutil.move(src, dst)
 
 
+_DANDI_FILES_REGEX = r"((^|%s)dandiset\.yaml|\.nwb)\Z" % re.escape(os.sep)
+
+
 def find_dandi_files(paths):
     """Adapter to find_files to find files of interest to dandi project"""
-    sep = re.escape(os.sep)
-    yield from find_files(rf"((^|{sep})dandiset\.yaml|\.nwb)\Z", paths)
+    yield from find_files(_DANDI_FILES_REGEX, paths)
+
+
+def find_dandi_file_entries(paths, jobs=None):
+    """Adapter to find_file_entries to find files of interest to dandi project"""
+    yield from find_file_entries(_DANDI_FILES_REGEX, paths, jobs=jobs)
 
 
 def find_parent_directory_containing(filename, path=None):
@@ -1,11 +1,19 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import os.path as op
 
 from . import get_logger
 from .consts import dandiset_metadata_file
+from .dandiset import DandisetState
 from .metadata import get_metadata
+from .pynwb_utils import dandi_cache_tokens
 from .pynwb_utils import validate as pynwb_validate
 from .pynwb_utils import validate_cache
-from .utils import find_dandi_files, yaml_load
+from .utils import (
+    find_dandi_file_entries,
+    find_parent_directory_containing,
+    yaml_load,
+)
 
 lgr = get_logger()
 
@@ -15,24 +23,140 @@ _required_nwb_metadata_fields = ["subject_id"]
 
 
 # TODO: provide our own "errors" records, which would also include warnings etc
-def validate(paths, schema_version=None, devel_debug=False):
+def validate(
+    paths, schema_version=None, devel_debug=False, jobs=None, changed_only=False
+):
     """Validate content
 
+    Results for files within a dandiset are recorded in its `ValidationIndex`.
+
     Parameters
     ----------
     paths: str or list of paths
       Could be individual (.nwb) files or a single dandiset path.
+    jobs: int, optional
+      Number of processes to validate files in parallel.  Results are still
+      yielded in the order of the files.  If None or 1 (or if `devel_debug`),
+      files are validated serially within the current process.
+    changed_only: bool, optional
+      Skip (and do not yield) files which the `ValidationIndex` of their
+      dandiset records as valid and which have not changed since.
 
     Yields
     ------
     path, errors
       errors for a path
     """
-    for path in find_dandi_files(paths):
-        errors = validate_file(
-            path, schema_version=schema_version, devel_debug=devel_debug
+    dandiset_paths = {}  # directory: path of its dandiset or None
+    indexes = {}  # dandiset path: ValidationIndex
+
+    def get_index(path):
+        dirpath = op.dirname(op.abspath(path))
+        if dirpath not in dandiset_paths:
+            dandiset_paths[dirpath] = find_parent_directory_containing(
+                dandiset_metadata_file, dirpath
+            )
+        dandiset_path = dandiset_paths[dirpath]
+        if dandiset_path is None:
+            return None
+        if dandiset_path not in indexes:
+            indexes[dandiset_path] = ValidationIndex(DandisetState(dandiset_path))
+        return indexes[dandiset_path]
+
+    def is_changed(path):
+        index = get_index(path)
+        return index is None or index.get_errors(path, schema_version) != []
+
+    entries = {}  # path: FileEntry, so the files are not stat'ed again
+
+    def get_filepaths():
+        for entry in find_dandi_file_entries(paths, jobs=jobs):
+            if not changed_only or is_changed(entry):
+                entries[entry.path] = entry
+                yield entry.path
+
+    try:
+        for path, errors in _validate_files(
+            get_filepaths(),
+            schema_version=schema_version,
+            devel_debug=devel_debug,
+            jobs=jobs,
+        ):
+            entry = entries.pop(path)
+            index = get_index(path)
+            if index is not None:
+                index.record(entry, errors, schema_version)
+            yield path, errors
+    finally:
+        for index in indexes.values():
+            index.save()
+
+
+def _validate_files(filepaths, schema_version=None, devel_debug=False, jobs=None):
+    if devel_debug or jobs is None or jobs == 1:
+        for path in filepaths:
+            errors = validate_file(
+                path, schema_version=schema_version, devel_debug=devel_debug
+            )
+            yield path, errors
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Keep a bounded number of files in flight, so that all workers stay
+        # busy while results are yielded in order as soon as they are ready
+        pending = deque()
+        for path in filepaths:
+            pending.append((path, executor.submit(validate_file, path, schema_version)))
+            if len(pending) >= 2 * jobs:
+                path, fut = pending.popleft()
+                yield path, fut.result()
+        while pending:
+            path, fut = pending.popleft()
+            yield path, fut.result()
+
+
+class ValidationIndex:
+    """Validation results for the files of a dandiset
+
+    The results are recorded in the `DandisetState` of the dandiset.  A
+    recorded result is reused only as long as the identity (size, mtime, inode)
+    of the file, the schema version, and the versions of the validating
+    libraries remain the same.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        state.set_validators(dandi_cache_tokens)
+
+    @property
+    def dandiset_path(self):
+        return self.state.dandiset_path
+
+    @classmethod
+    def for_path(cls, path):
+        """Return the index of the dandiset containing ``path``, or None"""
+        state = DandisetState.for_path(path)
+        return cls(state) if state is not None else None
+
+    def get_errors(self, filepath, schema_version=None):
+        """Return recorded errors, or None if the file needs to be validated"""
+        rec = self.state.get_record(filepath)
+        validation = rec["validation"] if rec is not None else None
+        if validation is None or validation["schema_version"] != schema_version:
+            return None
+        return validation["errors"]
+
+    def record(self, filepath, errors, schema_version=None):
+        """Record validation results for a file in its current state"""
+        self.state.update(
+            filepath,
+            validation={
+                "schema_version": schema_version,
+                "errors": list(map(str, errors)),
+            },
         )
-        yield path, errors
+
+    def save(self):
+        self.state.save()
 
 
 def validate_file(filepath, schema_version=None, devel_debug=False):
@@ -91,7 +215,7 @@ def validate_dandiset_yaml(filepath, schema_version=None, devel_debug=False):
 def validate_dandi_nwb(filepath, schema_version=None, devel_debug=False):
     """Provide validation of .nwb file regarding requirements we impose"""
     if schema_version is not None:
-        from dandischema.models import BareAsset, get_schema_version
+        from dandischema.models import get_schema_version
         from pydantic import ValidationError
 
         from .metadata import nwb2asset
@@ -102,10 +226,8 @@ def validate_dandi_nwb(filepath, schema_version=None, devel_debug=False):
                 f"Unsupported schema version: {schema_version}; expected {current_version}"
             )
         try:
-            asset = nwb2asset(
-                filepath, digest=32 * "d" + "-1", digest_type="dandi_etag"
-            )
-            BareAsset(**asset.dict())
+            # nwb2asset validates the asset while constructing the model
+            nwb2asset(filepath, digest=32 * "d" + "-1", digest_type="dandi_etag")
         except ValidationError as e:
             if devel_debug:
                 raise
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compare the time it takes to extract metadata from .nwb files via h5py and via
+pynwb.  If no files are given, a small sample file is created and timed.
+"""
+
+from datetime import datetime
+import os.path as op
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import click
+from dateutil.tz import tzutc
+import pynwb
+
+from dandi.pynwb_utils import (
+    _get_h5py_metadata,
+    _get_pynwb_metadata,
+    ignore_benign_pynwb_warnings,
+    make_nwb_file,
+)
+
+EXTRACTORS = {"h5py": _get_h5py_metadata, "pynwb": _get_pynwb_metadata}
+
+
+def make_sample_file(dirpath):
+    return make_nwb_file(
+        op.join(dirpath, "sample.nwb"),
+        session_description="sample session",
+        identifier="sample",
+        session_start_time=datetime(2017, 4, 15, 12, tzinfo=tzutc()),
+        experimenter=("Experimenter",),
+        subject=pynwb.file.Subject(
+            subject_id="mouse001",
+            date_of_birth=datetime(2016, 12, 1, tzinfo=tzutc()),
+            sex="M",
+            species="mouse",
+        ),
+    )
+
+
+def time_extractor(func, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        # bypass the persistent cache, we are timing the extraction itself
+        func(path)
+        times.append(perf_counter() - start)
+    return median(times)
+
+
+@click.command()
+@click.option(
+    "-n", "--repeat", type=int, default=20, show_default=True, help="Runs per file"
+)
+@click.argument("paths", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+def main(repeat, paths):
+    ignore_benign_pynwb_warnings()
+    with TemporaryDirectory() as tmpdir:
+        if not paths:
+            paths = [make_sample_file(tmpdir)]
+        for path in paths:
+            timings = {
+                name: time_extractor(func, path, repeat)
+                for name, func in EXTRACTORS.items()
+            }
+            click.echo(
+                f"{path}: "
+                + ", ".join(f"{name} {t * 1000:.1f}ms" for name, t in timings.items())
+                + f" (pynwb/h5py: {timings['pynwb'] / timings['h5py']:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compare the time it takes to scan .nwb files for the neurodata types of their
+groups via the former recursive scan and via the current single H5Ovisit pass.
+If no files are given, a synthetic file with 40k groups and 20k datasets is
+created and timed.
+"""
+
+from collections import Counter
+import os.path as op
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import click
+import h5py
+
+from dandi.pynwb_utils import _count_neurodata_types
+
+
+def scan_neurodata_types_recursive(grp):
+    # as done by _scan_neurodata_types() before it was replaced
+    out = []
+    if "neurodata_type" in grp.attrs:
+        out.append((grp.attrs["neurodata_type"], grp.attrs.get("description", None)))
+    for v in list(grp.values()):
+        if isinstance(v, h5py._hl.group.Group):
+            out += scan_neurodata_types_recursive(v)
+    return out
+
+
+def count_neurodata_types_recursive(h5file):
+    return Counter(p[0] for p in scan_neurodata_types_recursive(h5file))
+
+
+SCANNERS = {
+    "recursive": count_neurodata_types_recursive,
+    "h5ovisit": _count_neurodata_types,
+}
+
+
+def make_sample_file(dirpath, nseries=200, nsweeps=199):
+    # 1 + 200 * (1 + 199) = 40k groups, with a dataset in every other sweep
+    path = op.join(dirpath, "sample.nwb")
+    with h5py.File(path, "w") as f:
+        f.attrs["neurodata_type"] = "NWBFile"
+        for i in range(nseries):
+            series = f.create_group(f"series{i}")
+            series.attrs["neurodata_type"] = "TimeSeries"
+            series.attrs["description"] = f"series {i}"
+            for j in range(nsweeps):
+                sweep = series.create_group(f"sweep{j}")
+                sweep.attrs["neurodata_type"] = "PatchClampSeries"
+                if j % 2:
+                    sweep.create_dataset("data", data=[i, j])
+        f.create_group("untyped").create_dataset("data", data=[0])
+    return path
+
+
+def time_scanner(func, path, repeat):
+    times = []
+    for _ in range(repeat):
+        with h5py.File(path, "r") as h5file:
+            start = perf_counter()
+            counts = func(h5file)
+            times.append(perf_counter() - start)
+    return median(times), counts
+
+
+@click.command()
+@click.option(
+    "-n", "--repeat", type=int, default=3, show_default=True, help="Runs per file"
+)
+@click.argument("paths", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+def main(repeat, paths):
+    with TemporaryDirectory() as tmpdir:
+        if not paths:
+            paths = [make_sample_file(tmpdir)]
+        for path in paths:
+            timings = {}
+            results = {}
+            for name, func in SCANNERS.items():
+                timings[name], results[name] = time_scanner(func, path, repeat)
+            click.echo(
+                f"{path}: "
+                + ", ".join(f"{name} {t:.2f}s" for name, t in timings.items())
+                + " (recursive/h5ovisit: "
+                f"{timings['recursive'] / timings['h5ovisit']:.1f}x)"
+            )
+            if results["recursive"] != results["h5ovisit"]:
+                # e.g. groups reachable via several links are counted once now
+                click.echo(
+                    f"  counts differ: {dict(results['recursive'])} vs "
+                    f"{dict(results['h5ovisit'])}"
+                )
+
+
+if __name__ == "__main__":
+    main()